@@ -1,14 +1,19 @@
-from flask import Flask, redirect, url_for
+import json
+import os
+import time
+import click
+from flask import Flask, redirect, url_for, send_file, jsonify
 from flasgger import Swagger
 from config import Config
-from database import db
-from extensions import jwt, cache, limiter
-import warnings
-warnings.filterwarnings("ignore", message="Using the in-memory storage")
+from database import db, lift_statement_timeout
+from extensions import jwt, cache, limiter, compress, ORJSONProvider
 
+# Especificação Swagger congelada (gerada por flask swagger-freeze na fase de release)
+APISPEC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'apispec.json')
 
 def create_app():
     app = Flask(__name__)
+    app.json = ORJSONProvider(app)
     app.config.from_object(Config)
 
     # Inicializa extensões
@@ -16,7 +21,12 @@ def create_app():
     jwt.init_app(app)
     cache.init_app(app)
     limiter.init_app(app)
-    Swagger(app, template=Config.SWAGGER_TEMPLATE)
+    compress.init_app(app)
+    swagger = Swagger(app, template=Config.SWAGGER_TEMPLATE)
+
+    # Em produção serve a especificação congelada, sem reprocessar o YAML das docstrings em cada worker
+    if Config.SWAGGER_FROZEN_SPEC and os.path.exists(APISPEC_PATH):
+        app.view_functions['flasgger.apispec_1'] = lambda: send_file(APISPEC_PATH, mimetype='application/json')
 
     # Importa e registra os blueprints
     from routes.auth import auth_bp
@@ -25,13 +35,128 @@ def create_app():
     app.register_blueprint(auth_bp)
     app.register_blueprint(books_bp)
 
+    # 429 com Retry-After exato (fim da janela do limite estourado), para o cliente esperar em vez de insistir
+    @app.errorhandler(429)
+    def rate_limited(e):
+        current = limiter.current_limit
+        retry_after = max(1, int(current.reset_at - time.time()) + 1) if current else 1
+        response = jsonify({"error": "Limite de requisições excedido", "retry_after": retry_after})
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 429
+
+    # 503 do pool de hash sobrecarregado (extensions.run_hash), em JSON como o 429
+    @app.errorhandler(503)
+    def service_unavailable(e):
+        response = jsonify({"error": e.description})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+
     @app.route('/')
     def index():
         return redirect(url_for('flasgger.apidocs'))
 
-    with app.app_context():
+    # Cria as tabelas sob demanda (flask init-db), sem tocar no banco a cada boot de worker
+    @app.cli.command('init-db')
+    def init_db():
+        """Cria as tabelas do banco de dados e adiciona colunas/índices novos às já existentes."""
+        from sqlalchemy import inspect
+        if db.engine.dialect.name == 'postgresql':
+            # Necessária para os índices de trigramas da tabela books
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql('CREATE EXTENSION IF NOT EXISTS pg_trgm')
         db.create_all()
 
+        # create_all não altera tabelas que já existem: colunas e índices adicionados aos modelos
+        # depois da criação (ex.: books.title_tokens, ix_books_*) são criados aqui
+        inspector = inspect(db.engine)
+        preparer = db.engine.dialect.identifier_preparer
+        with db.engine.begin() as conn:
+            # Índices em tabelas grandes levam mais que o statement_timeout das requisições
+            lift_statement_timeout(conn)
+            for table in db.metadata.sorted_tables:
+                existing = {c['name'] for c in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name not in existing:
+                        column_type = column.type.compile(dialect=db.engine.dialect)
+                        conn.exec_driver_sql(
+                            f"ALTER TABLE {preparer.format_table(table)} "
+                            f"ADD COLUMN {preparer.format_column(column)} {column_type}"
+                        )
+                        click.echo(f"Coluna {table.name}.{column.name} adicionada")
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+            if db.engine.dialect.name != 'postgresql':
+                # Versões anteriores criavam os índices de trigramas também fora do PostgreSQL, como
+                # B-trees comuns (o de category duplicando ix_books_category)
+                for name in ('ix_books_title_trgm', 'ix_books_category_trgm'):
+                    conn.exec_driver_sql(f'DROP INDEX IF EXISTS {name}')
+
+        # Livros carregados antes das colunas de tokens existirem ficam com NULL: tokeniza aqui,
+        # senão as rotas de ML leriam essas linhas como se não tivessem texto
+        from routes.books import backfill_tokens
+        try:
+            updated = backfill_tokens()
+        except LookupError:
+            raise click.ClickException(
+                "Stopwords do NLTK indisponíveis: instale o corpus e rode flask init-db de novo "
+                "para preencher books.title_tokens/description_tokens"
+            )
+        if updated:
+            click.echo(f"Tokens preenchidos em {updated} livros")
+        click.echo("Tabelas criadas com sucesso")
+
+    @app.cli.command('audit-hashes')
+    @click.option('--chunk-size', default=1000, show_default=True)
+    def audit_hashes(chunk_size):
+        """Conta os usuários com hash legado ou Argon2 desatualizado (migrados no próximo login)."""
+        from sqlalchemy import select
+        from models import User, password_needs_rehash
+        total = pending = 0
+        rows = db.session.execute(
+            select(User.password).execution_options(yield_per=chunk_size)
+        ).scalars()
+        for stored in rows:
+            total += 1
+            pending += password_needs_rehash(stored)
+        click.echo(f"{pending} de {total} usuários serão migrados para Argon2id no próximo login")
+
+    @app.cli.command('calibrate-argon2')
+    def calibrate_argon2_cmd():
+        """Calibra o custo do Argon2 neste host e mostra o valor de ARGON2_PARAMS."""
+        from extensions import calibrate_argon2
+        time_cost, memory_cost = calibrate_argon2()
+        click.echo(f"ARGON2_PARAMS={time_cost},{memory_cost}")
+
+    @app.cli.command('train-model')
+    def train_model():
+        """Treina o modelo de previsão de preço e o encoder de categorias com os livros do banco."""
+        import pandas as pd
+        import ml
+        from models import Book
+        with db.engine.begin() as conn:
+            df = pd.read_sql(
+                db.select(Book.category, Book.rating, Book.availability_numeric.label('availability'),
+                          Book.number_of_reviews, Book.price_numeric.label('price')),
+                lift_statement_timeout(conn)
+            )
+        df['category'] = df['category'].str.strip()
+        df['number_of_reviews'] = df['number_of_reviews'].fillna(0)
+        df['in_stock'] = (df['availability'] > 0).astype(int)
+        ml.train_model(df)
+        ml.fit_category_encoder(df['category'].dropna().unique().tolist(), save=True)
+        click.echo(f"Modelo treinado com {len(df)} livros e salvo em {ml.MODEL_PATH}")
+        click.echo(f"Encoder de categorias salvo em {ml.ENCODER_PATH}")
+
+    @app.cli.command('swagger-freeze')
+    def swagger_freeze():
+        """Gera static/apispec.json com a especificação Swagger da API."""
+        with app.test_request_context():
+            spec = swagger.get_apispecs()
+        os.makedirs(os.path.dirname(APISPEC_PATH), exist_ok=True)
+        with open(APISPEC_PATH, 'w', encoding='utf-8') as f:
+            json.dump(spec, f, ensure_ascii=False)
+        click.echo(f"Especificação salva em {APISPEC_PATH}")
+
     return app
 
 app = create_app()
@@ -9,12 +9,51 @@ class Config:
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    CACHE_TYPE = 'simple'
+    # Pool dimensionado para rajadas de login: conexões quentes evitam o handshake TCP/TLS no /login,
+    # pre_ping descarta conexões derrubadas pelo Render e statement_timeout limita o pior caso das
+    # requisições (cargas em lote e o CLI o desligam com database.lift_statement_timeout)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": 20,
+        "max_overflow": 10,
+        "pool_timeout": 5,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "connect_args": {"options": "-c statement_timeout=3000"},
+    } if (SQLALCHEMY_DATABASE_URI or "").startswith("postgres") else {}
+    # Cache no Redis (compartilhado entre os workers) quando REDIS_URL estiver definida
+    CACHE_TYPE = 'extensions.MsgpackRedisCache' if os.getenv("REDIS_URL") else 'simple'
+    CACHE_REDIS_URL = os.getenv("REDIS_URL")
     CACHE_DEFAULT_TIMEOUT = 300 
 
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=1)
+    # Compressão (Flask-Compress) das respostas JSON grandes (/books, /ml/features, /ml/training-data)
+    COMPRESS_MIMETYPES = ['application/json']
+    COMPRESS_MIN_SIZE = 1024
+    # Cache no navegador para arquivos estáticos e a spec congelada do Swagger
+    SEND_FILE_MAX_AGE_DEFAULT = timedelta(hours=1)
+
+    # Rate limit compartilhado entre os workers via Redis (memória local só em desenvolvimento),
+    # usando o Redis do cache quando não houver um dedicado.
+    # moving-window é executado atomicamente no Redis por script Lua e absorve rajadas sem
+    # multiplicar o limite pelo número de workers
+    RATELIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_REDIS_URL") or os.getenv("REDIS_URL") or "memory://"
+    RATELIMIT_STRATEGY = "moving-window"
+
+    # Com um par de chaves Ed25519 os tokens são assinados com EdDSA: quem só verifica (proxy, outros
+    # serviços) recebe apenas a chave pública. Sem as chaves, mantém HS256 com JWT_SECRET_KEY
+    JWT_PRIVATE_KEY = os.getenv("JWT_PRIVATE_KEY")
+    JWT_PUBLIC_KEY = os.getenv("JWT_PUBLIC_KEY")
+    JWT_ALGORITHM = "EdDSA" if JWT_PRIVATE_KEY and JWT_PUBLIC_KEY else "HS256"
+
+    # Claim "sub" numérico (id do usuário); o PyJWT exige string por padrão
+    JWT_VERIFY_SUB = False
+
+    # 15 minutos: com 1 minuto o cliente precisava de um /refresh a quase toda requisição
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=15)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=7)
 
+    # Serve o static/apispec.json gerado por flask swagger-freeze em vez de montar a spec em runtime
+    SWAGGER_FROZEN_SPEC = os.getenv("FLASK_ENV") == "production"
+
     SWAGGER_TEMPLATE = {
         "swagger": "2.0",
         "info": {
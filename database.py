@@ -1,3 +1,13 @@
-
 from flask_sqlalchemy import SQLAlchemy
-db = SQLAlchemy()
\ No newline at end of file
+db = SQLAlchemy()
+
+def lift_statement_timeout(conn):
+    """
+    Desliga o statement_timeout das conexões (config.py) só na transação atual de ``conn``.
+
+    Para cargas em lote e comandos do CLI, que passam dos 3 s das requisições comuns; o
+    SET LOCAL termina com a transação, então a conexão volta ao pool com o limite padrão.
+    """
+    if conn.dialect.name == 'postgresql':
+        conn.exec_driver_sql('SET LOCAL statement_timeout = 0')
+    return conn
@@ -1,8 +1,259 @@
-from flask_jwt_extended import JWTManager
+import os
+import time
+import logging
+import pickle
+import base64
+import hashlib
+import hmac
+import re
+import uuid
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import msgpack
+import orjson
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+from flask_jwt_extended import JWTManager, create_access_token, create_refresh_token
+from flask_jwt_extended.config import config as jwt_config
+from flask_jwt_extended.default_callbacks import (
+    default_additional_claims_callback,
+    default_encode_key_callback,
+    default_jwt_headers_callback,
+)
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_caching import Cache
+from flask_compress import Compress
+from flask_caching.backends.rediscache import RedisCache
+from cachelib.serializers import RedisSerializer
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError, InvalidHashError
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import check_password_hash
 
 jwt = JWTManager()
 cache = Cache()
+compress = Compress()
 limiter = Limiter(key_func=get_remote_address)
+
+# O "sub" dos tokens é o id numérico do usuário: get_jwt_identity() já devolve int, sem str() / int()
+@jwt.user_identity_loader
+def _user_identity(user_id):
+    return int(user_id)
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+# O cabeçalho é o mesmo em todo token HS256: serializado e codificado uma única vez
+_JWT_HEADER_B64 = _b64(orjson.dumps({"alg": "HS256", "typ": "JWT"}))
+
+def _fast_jwt_enabled(config):
+    # Só vale para a configuração padrão (HS256 via header, sem aud/iss) e sem callbacks próprios
+    # de claims, headers, chave ou identidade registrados no JWTManager: nesses casos o token
+    # seria diferente, então segue pelo flask_jwt_extended
+    return (
+        config["JWT_ALGORITHM"] == "HS256"
+        and config["JWT_ENCODE_NBF"]
+        and not config.get("JWT_ENCODE_AUDIENCE")
+        and not config.get("JWT_ENCODE_ISSUER")
+        and "cookies" not in config["JWT_TOKEN_LOCATION"]
+        and jwt._user_claims_callback is default_additional_claims_callback
+        and jwt._jwt_additional_header_callback is default_jwt_headers_callback
+        and jwt._encode_key_callback is default_encode_key_callback
+        and jwt._user_identity_callback is _user_identity
+    )
+
+def _encode_jwt_fast(identity, token_type, expires_delta):
+    config = current_app.config
+    now = int(datetime.now(timezone.utc).timestamp())
+    payload = {
+        "fresh": False,
+        "iat": now,
+        "jti": str(uuid.uuid4()),
+        "type": token_type,
+        config["JWT_IDENTITY_CLAIM"]: _user_identity(identity),
+        "nbf": now,
+    }
+    # Como o flask_jwt_extended, que inclui a claim csrf sempre que JWT_COOKIE_CSRF_PROTECT está ligado
+    if config["JWT_COOKIE_CSRF_PROTECT"]:
+        payload["csrf"] = str(uuid.uuid4())
+    if expires_delta:
+        payload["exp"] = now + int(expires_delta.total_seconds())
+    signing_input = _JWT_HEADER_B64 + b"." + _b64(orjson.dumps(payload))
+    # Mesma chave do flask_jwt_extended (JWT_SECRET_KEY, ou SECRET_KEY quando ela não está definida)
+    key = jwt._encode_key_callback(identity)
+    signature = hmac.new(key.encode() if isinstance(key, str) else key, signing_input, hashlib.sha256).digest()
+    return (signing_input + b"." + _b64(signature)).decode()
+
+def create_access_token_fast(identity):
+    """Equivalente a ``create_access_token(identity=...)`` reaproveitando o cabeçalho pré-codificado."""
+    if not _fast_jwt_enabled(current_app.config):
+        return create_access_token(identity=identity)
+    # access_expires/refresh_expires normalizam a configuração (segundos inteiros, timedelta ou False)
+    return _encode_jwt_fast(identity, "access", jwt_config.access_expires)
+
+def create_refresh_token_fast(identity):
+    """Equivalente a ``create_refresh_token(identity=...)`` reaproveitando o cabeçalho pré-codificado."""
+    if not _fast_jwt_enabled(current_app.config):
+        return create_refresh_token(identity=identity)
+    return _encode_jwt_fast(identity, "refresh", jwt_config.refresh_expires)
+
+class MsgpackSerializer(RedisSerializer):
+    """Serializa em msgpack (mais rápido que pickle para dicts/listas simples).
+
+    Valores que o msgpack não suporta, como o Response guardado pelo
+    ``@cache.cached`` das views, caem no pickle padrão do RedisSerializer.
+    """
+
+    def dumps(self, value, protocol=pickle.HIGHEST_PROTOCOL):
+        try:
+            return b"m" + msgpack.packb(value, use_bin_type=True)
+        except (TypeError, ValueError, OverflowError):
+            return super().dumps(value, protocol)
+
+    def loads(self, value):
+        if value is not None and value.startswith(b"m"):
+            return msgpack.unpackb(value[1:], raw=False)
+        return super().loads(value)
+
+class MsgpackRedisCache(RedisCache):
+    """Cache no Redis compartilhado entre os workers, serializado com msgpack."""
+
+    serializer = MsgpackSerializer()
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Provider JSON do Flask com orjson (em C): ``jsonify`` fica mais rápido nas respostas grandes de ML.
+
+    Mantém as chaves ordenadas como o provider padrão; chaves não-string (ex.: rating) e
+    arrays do NumPy são aceitos. Com ``indent`` (modo debug) indenta com 2 espaços, ainda pelo
+    orjson: o provider padrão não serializa os arrays do NumPy do /ml/features?format=columns.
+    """
+
+    option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, obj, **kwargs):
+        option = self.option | orjson.OPT_INDENT_2 if kwargs.get("indent") else self.option
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+logger = logging.getLogger(__name__)
+
+ARGON2_TIME_COST = 2
+ARGON2_PARALLELISM = 1
+ARGON2_TARGET_SECONDS = (0.2, 0.3)
+
+def calibrate_argon2(time_cost=ARGON2_TIME_COST, low=8 * 1024, high=256 * 1024):
+    """
+    Busca binária do memory_cost (KiB) cujo hash leva entre 200 e 300 ms neste host.
+
+    Returns:
+        tuple: (time_cost, memory_cost) escolhidos.
+    """
+    min_dt, max_dt = ARGON2_TARGET_SECONDS
+    memory_cost = low
+    while low <= high:
+        memory_cost = (low + high) // 2 // 1024 * 1024
+        t0 = time.perf_counter()
+        PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=ARGON2_PARALLELISM).hash("x")
+        dt = time.perf_counter() - t0
+        if dt < min_dt:
+            low = memory_cost + 1024
+        elif dt > max_dt:
+            high = memory_cost - 1024
+        else:
+            break
+    return time_cost, memory_cost
+
+def _argon2_params():
+    # Deploys de produção fixam os parâmetros em ARGON2_PARAMS="time_cost,memory_cost"
+    params = os.getenv("ARGON2_PARAMS")
+    if params:
+        time_cost, memory_cost = (int(p) for p in params.split(","))
+        return time_cost, memory_cost
+    # A calibração depende da carga do host no boot (workers subindo juntos escolhem um hash mais
+    # fraco): em produção os parâmetros vêm sempre de flask calibrate-argon2, feito uma vez
+    if os.getenv("FLASK_ENV") == "production":
+        raise RuntimeError(
+            "ARGON2_PARAMS não definido: gere os parâmetros com flask calibrate-argon2 e fixe a variável"
+        )
+    time_cost, memory_cost = calibrate_argon2()
+    # Guarda o resultado para que processos filhos (pool de hash) não recalibrem
+    os.environ["ARGON2_PARAMS"] = f"{time_cost},{memory_cost}"
+    logger.info("Argon2 calibrado: ARGON2_PARAMS=%s,%s", time_cost, memory_cost)
+    return time_cost, memory_cost
+
+# Hasher Argon2id compartilhado (memory-hard, mais rápido que PBKDF2 com segurança equivalente),
+# calibrado uma única vez no import para o custo alvo deste host
+_time_cost, _memory_cost = _argon2_params()
+ph = PasswordHasher(time_cost=_time_cost, memory_cost=_memory_cost, parallelism=ARGON2_PARALLELISM)
+
+# Pool de processos opcional para o hash de senhas (HASH_POOL_WORKERS > 0), para workers
+# assíncronos (threads/gevent) que não devem ocupar o core com o Argon2. Desligado por padrão:
+# o argon2-cffi libera o GIL e o worker síncrono espera o resultado de qualquer forma, então o
+# pool só acrescentaria processos e IPC. Criado sob demanda para não ser herdado pelo fork do gunicorn
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", "0"))
+_HASH_POOL = None
+HASH_TIMEOUT = 2
+
+def hash_pool():
+    global _HASH_POOL
+    if _HASH_POOL is None:
+        _HASH_POOL = ProcessPoolExecutor(max_workers=HASH_POOL_WORKERS)
+    return _HASH_POOL
+
+def _reset_hash_pool():
+    global _HASH_POOL
+    if _HASH_POOL is not None:
+        _HASH_POOL.shutdown(wait=False, cancel_futures=True)
+        _HASH_POOL = None
+
+def run_hash(fn, *args):
+    """
+    Executa ``fn(*args)`` (hash ou verificação) no pool de hash, ou no próprio worker sem pool.
+
+    Um processo filho morto (ex.: OOM com o memory_cost do Argon2) quebra o pool inteiro: ele é
+    recriado e a chamada roda no próprio worker. Fila cheia além de HASH_TIMEOUT vira 503.
+    """
+    if not HASH_POOL_WORKERS:
+        return fn(*args)
+    future = hash_pool().submit(fn, *args)
+    try:
+        return future.result(timeout=HASH_TIMEOUT)
+    except BrokenProcessPool:
+        logger.warning("Pool de hash quebrado (processo filho encerrado); recriando")
+        _reset_hash_pool()
+        return fn(*args)
+    except FutureTimeoutError:
+        future.cancel()
+        raise ServiceUnavailable("Serviço de autenticação sobrecarregado, tente novamente")
+
+def _do_hash(password):
+    return ph.hash(password)
+
+# Formato werkzeug "pbkdf2:<hash>:<iterações>$<salt>$<hex>"
+_PBKDF2_HASH_RE = re.compile(r'^pbkdf2:(\w+):(\d+)\$([^$]*)\$([0-9a-f]+)$')
+
+def check_pbkdf2_hash(stored, password):
+    """
+    Valida um hash PBKDF2 legado do werkzeug chamando ``hashlib.pbkdf2_hmac`` direto.
+
+    Outros formatos do werkzeug (ex.: scrypt) seguem por ``check_password_hash``.
+    """
+    match = _PBKDF2_HASH_RE.match(stored)
+    if match is None:
+        return check_password_hash(stored, password)
+    hash_name, iterations, salt, expected = match.groups()
+    derived = hashlib.pbkdf2_hmac(hash_name, password.encode(), salt.encode(), int(iterations))
+    return hmac.compare_digest(derived.hex(), expected)
+
+def _do_verify(stored, password):
+    # Hashes legados (PBKDF2 do werkzeug) são validados pelo caminho antigo
+    if not stored.startswith('$argon2'):
+        return check_pbkdf2_hash(stored, password)
+    try:
+        return ph.verify(stored, password)
+    except (VerifyMismatchError, InvalidHashError):
+        return False
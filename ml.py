@@ -0,0 +1,73 @@
+import os
+import joblib
+import pandas as pd
+
+# Modelo de preço treinado por flask train-model (gerado na fase de release)
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model.joblib')
+
+# One-hot de category do /ml/features, ajustado uma vez pelo mesmo comando
+ENCODER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'encoder.joblib')
+
+CATEGORICAL_FEATURES = ['category']
+NUMERICAL_FEATURES = ['rating', 'availability', 'in_stock', 'number_of_reviews']
+
+def build_pipeline():
+    # scikit-learn importado só no treino: o boot dos workers não paga esse custo
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder
+    preprocessor = ColumnTransformer(
+        transformers=[('cat', OneHotEncoder(handle_unknown='ignore'), CATEGORICAL_FEATURES)],
+        remainder='passthrough'
+    )
+    return Pipeline([('pre', preprocessor), ('rf', RandomForestRegressor(n_jobs=-1, random_state=42))])
+
+def train_model(df):
+    """
+    Treina o pipeline de previsão de preço e salva em MODEL_PATH.
+
+    Args:
+        df (DataFrame): colunas de CATEGORICAL_FEATURES + NUMERICAL_FEATURES e 'price'.
+
+    Returns:
+        Pipeline: modelo treinado.
+    """
+    model = build_pipeline()
+    model.fit(df[CATEGORICAL_FEATURES + NUMERICAL_FEATURES], df['price'])
+    joblib.dump(model, MODEL_PATH)
+    return model
+
+def load_model():
+    # None quando o modelo ainda não foi treinado neste deploy
+    if not os.path.exists(MODEL_PATH):
+        return None
+    return joblib.load(MODEL_PATH)
+
+def predict(model, book_data):
+    row = pd.DataFrame([book_data], columns=CATEGORICAL_FEATURES + NUMERICAL_FEATURES)
+    return round(float(model.predict(row)[0]), 2)
+
+def fit_category_encoder(categories, save=False):
+    """
+    Ajusta o one-hot de category num vocabulário fixo (mesmas colunas em todas as requisições).
+
+    Args:
+        categories (list): categorias conhecidas.
+        save (bool): salva o encoder em ENCODER_PATH.
+
+    Returns:
+        OneHotEncoder: encoder ajustado.
+    """
+    from sklearn.preprocessing import OneHotEncoder
+    categories = sorted(categories)
+    encoder = OneHotEncoder(categories=[categories], handle_unknown='ignore', sparse_output=False)
+    encoder.fit(pd.DataFrame({'category': categories}))
+    if save:
+        joblib.dump(encoder, ENCODER_PATH)
+    return encoder
+
+def load_category_encoder():
+    if not os.path.exists(ENCODER_PATH):
+        return None
+    return joblib.load(ENCODER_PATH)
@@ -1,23 +1,68 @@
 # Importa o db de nosso novo arquivo
 from database import db 
-from werkzeug.security import generate_password_hash, check_password_hash
+from extensions import ph, run_hash, _do_hash, _do_verify
+from argon2 import Type, extract_parameters
+from argon2.exceptions import InvalidHashError
 from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import JSONB
+
+def hash_password(password):
+    return run_hash(_do_hash, password)
+
+def verify_password(stored, password):
+    return run_hash(_do_verify, stored, password)
+
+def password_needs_rehash(stored):
+    # Verdadeiro para hashes legados ou Argon2 mais fracos que os parâmetros atuais. Hashes mais
+    # fortes são mantidos: parâmetros diferentes entre hosts não regravam a senha a cada login
+    if not stored.startswith('$argon2'):
+        return True
+    try:
+        params = extract_parameters(stored)
+    except InvalidHashError:
+        return True
+    return (
+        params.type is not Type.ID
+        or params.time_cost < ph.time_cost
+        or params.memory_cost < ph.memory_cost
+    )
 
 # --- Modelos de Banco de Dados ---
 
 class User(db.Model):
+    # Índice de cobertura: o /login resolve id e password direto do índice (index-only scan no PostgreSQL)
+    __table_args__ = (
+        db.Index('ix_user_username_cover', 'username', postgresql_include=['id', 'password']),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password = db.Column(db.String(120), nullable=False)
 
     def set_password(self, password):
-        self.password = generate_password_hash(password, method='pbkdf2:sha256', salt_length=16)
+        self.password = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return verify_password(self.password, password)
+
+    def needs_rehash(self):
+        return password_needs_rehash(self.password)
    
 class Book(db.Model):
     __tablename__ = 'books'
+    # B-tree nas colunas de filtro/agrupamento/ordenação; trigramas (pg_trgm) para o ILIKE '%...%' do /search
+    __table_args__ = (
+        db.Index('ix_books_category', 'category'),
+        # (rating DESC, id) atende o ORDER BY e o cursor keyset do /top-rated
+        db.Index('ix_books_rating_desc_id', db.text('rating DESC'), 'id'),
+        db.Index('ix_books_price_numeric', 'price_numeric'),
+        # Só no PostgreSQL: nos outros bancos virariam B-trees comuns, e o de category duplicaria ix_books_category
+        db.Index('ix_books_title_trgm', 'title', postgresql_using='gin',
+                 postgresql_ops={'title': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        db.Index('ix_books_category_trgm', 'category', postgresql_using='gin',
+                 postgresql_ops={'category': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String, nullable=False)
     category = db.Column(db.String)
@@ -35,6 +80,9 @@ class Book(db.Model):
     tax = db.Column(db.Float)
     price_numeric = db.Column(db.Float)
     availability_numeric = db.Column(db.Integer)
+    # Tokens de título/descrição (minúsculas, sem stopwords em inglês), calculados uma vez no load_books
+    title_tokens = db.Column(db.JSON().with_variant(JSONB(), 'postgresql'))
+    description_tokens = db.Column(db.JSON().with_variant(JSONB(), 'postgresql'))
     
     def to_dict(self):
         return {
@@ -1,15 +1,70 @@
 # routes/auth.py
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, create_refresh_token
-from sqlalchemy import text 
-from werkzeug.security import generate_password_hash, check_password_hash
+import orjson
+import fastjsonschema
+from flask import Blueprint, request, jsonify, g
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select, update, bindparam
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from database import db 
-from models import User 
-from extensions import limiter
+from models import User, hash_password, verify_password, password_needs_rehash
+from extensions import ph, limiter, create_access_token_fast, create_refresh_token_fast
+from flask_limiter.util import get_remote_address
 
 # Cria o Blueprint
 auth_bp = Blueprint('auth', __name__)
 
+# INSERT ... ON CONFLICT DO NOTHING por dialeto (PostgreSQL em produção, SQLite em desenvolvimento)
+_INSERT_ON_CONFLICT = {
+    'postgresql': pg_insert,
+    'sqlite': sqlite_insert,
+}
+
+# Statements montados uma única vez no import; o cache de compilação do SQLAlchemy os reconhece direto
+# Busca somente as colunas usadas no login (coberto pelo índice ix_user_username_cover)
+_LOGIN_STMT = select(User.id, User.password).where(User.username == bindparam('username'))
+_EXISTS_STMT = select(1).where(User.username == bindparam('username')).limit(1)
+
+# Validador do corpo de /register e /login, compilado uma única vez no import
+_validate_credentials = fastjsonschema.compile({
+    "type": "object",
+    "required": ["username", "password"],
+    "properties": {
+        "username": {"type": "string", "minLength": 1, "maxLength": 80},
+        "password": {"type": "string", "minLength": 1, "maxLength": 256},
+    },
+})
+
+_UNPARSED = object()
+
+def _parse_credentials():
+    # orjson + schema pré-compilado: corpo malformado vira 400 antes de tocar no banco ou no hasher.
+    # Lido uma única vez por requisição e guardado em g: as chaves do rate limit e a view usam o
+    # mesmo corpo, com ou sem o header Content-Type
+    data = g.get('credentials', _UNPARSED)
+    if data is _UNPARSED:
+        try:
+            data = _validate_credentials(orjson.loads(request.get_data()))
+        except (orjson.JSONDecodeError, fastjsonschema.JsonSchemaException):
+            data = None
+        g.credentials = data
+    return data
+
+# Hash de uma senha que nunca é válida: o /login verifica contra ele quando o usuário não existe
+_DUMMY_HASH = ph.hash("dummy-password-never-valid")
+
+def _login_username():
+    data = _parse_credentials()
+    return data['username'] if data else ''
+
+def login_key():
+    # Limite por IP + username: usuários atrás do mesmo NAT não bloqueiam uns aos outros
+    return f"{get_remote_address()}|{_login_username()}"
+
+def username_key():
+    # Limite por username em todos os IPs: bloqueia credential stuffing com rotação de IP
+    return _login_username() or get_remote_address()
+
 @auth_bp.route('/register', methods=['POST'])
 @limiter.limit("5 per 10 minutes", override_defaults=True)
 def register_user():
@@ -33,26 +88,48 @@ def register_user():
       201:
         description: Usuário criado com sucesso
       400:
-        description: Usuário já existe
+        description: Usuário já existe ou corpo da requisição inválido
     """
-    data = request.get_json()
-    if User.query.filter_by(username=data['username']).first():
-        return jsonify({"error": "User already exists"}), 400
-    
-    # Criptografa a senha com um algoritmo seguro (PBKDF2)
-    hashed_password = generate_password_hash(data['password'], method='pbkdf2:sha256', salt_length=16)
+    data = _parse_credentials()
+    if data is None:
+        return jsonify({"error": "Requisição inválida"}), 400
+
+    # Criptografa a senha com um algoritmo seguro (Argon2id)
+    new_user = User(username=data['username'])
+    new_user.set_password(data['password'])
 
-    new_user = User(username=data['username'], password=hashed_password)
-    db.session.add(new_user)
+    # Um único INSERT que ignora usernames duplicados: evita a consulta prévia
+    # de existência e a condição de corrida entre dois registros simultâneos
+    dialect_insert = _INSERT_ON_CONFLICT.get(db.engine.dialect.name)
+    if dialect_insert is None:
+        existing = db.session.execute(_EXISTS_STMT, {'username': new_user.username}).first()
+        if existing:
+            return jsonify({"error": "User already exists"}), 400
+        db.session.add(new_user)
+        db.session.commit()
+        return jsonify({"msg": "User created"}), 201
+
+    stmt = (
+        dialect_insert(User)
+        .values(username=new_user.username, password=new_user.password)
+        .on_conflict_do_nothing(index_elements=['username'])
+        .returning(User.id)
+    )
+    row = db.session.execute(stmt).first()
     db.session.commit()
+    if row is None:
+        return jsonify({"error": "User already exists"}), 400
     return jsonify({"msg": "User created"}), 201
 
 
 @auth_bp.route('/login', methods=['POST'])
-@limiter.limit("5 per 10 minutes", override_defaults=True)
+@limiter.limit("5 per 10 minutes", key_func=login_key, override_defaults=True)
+@limiter.limit("10 per hour", key_func=username_key, override_defaults=True)
 def login():
     """
     Faz login do usuário e retorna um JWT.
+    Usuário inexistente e senha errada custam o mesmo (uma consulta e uma verificação
+    de hash), para que o tempo de resposta não revele quais usernames existem.
     ---
     tags:
       - Authentication
@@ -70,14 +147,26 @@ def login():
     responses:
       200:
         description: Login bem sucedido, retorna JWT
+      400:
+        description: Corpo da requisição inválido
       401:
         description: Credenciais inválidas
     """
-    data = request.get_json()
-    user = User.query.filter_by(username=data['username']).first()
-    if user and check_password_hash(user.password, data['password']):
-        access_token = create_access_token(identity=str(user.id))
-        refresh_token = create_refresh_token(identity=str(user.id))
+    data = _parse_credentials()
+    if data is None:
+        return jsonify({"error": "Requisição inválida"}), 400
+    user = db.session.execute(_LOGIN_STMT, {'username': data['username']}).first()
+    # Sem usuário, verifica contra o hash fictício: mesmo custo de Argon2 nos dois ramos de falha
+    stored = user.password if user else _DUMMY_HASH
+    if verify_password(stored, data['password']) and user:
+        # Migra hashes legados (PBKDF2) para Argon2id no primeiro login bem sucedido
+        if password_needs_rehash(user.password):
+            db.session.execute(
+                update(User).where(User.id == user.id).values(password=hash_password(data['password']))
+            )
+            db.session.commit()
+        access_token = create_access_token_fast(user.id)
+        refresh_token = create_refresh_token_fast(user.id)
         return jsonify(access_token=access_token, refresh_token=refresh_token), 200
 
     
@@ -127,5 +216,5 @@ def refresh():
         description: Refresh token inválido ou expirado
     """
     current_user = get_jwt_identity() # Pega o identity para o refresh token
-    new_access_token = create_access_token(identity=current_user) # Cria nova token
+    new_access_token = create_access_token_fast(current_user) # Cria nova token
     return jsonify(access_token=new_access_token), 200  
@@ -1,32 +1,150 @@
 # routes/books.py
 
+import functools
+import os
+import re
+from math import ceil, isfinite
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
-from sqlalchemy import text, func
-from math import ceil
-from extensions import limiter
+from sqlalchemy import text, func, or_, and_, select, bindparam
+import numpy as np
+import pandas as pd
 
 # Importações de outros arquivos
-from database import db 
+from database import db, lift_statement_timeout
 from models import  Book 
-from app import cache, limiter # importado de app.py
-import os
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-import re
-import pandas as pd
-from sklearn.preprocessing import  OneHotEncoder
-from sklearn.compose import ColumnTransformer
-from sklearn.model_selection import train_test_split
-import random
+from extensions import cache, limiter
+import ml
+
+NLTK_DATA_DIR = os.path.join(os.getcwd(), "nltk_data")
+
+@functools.cache
+def _stopwords(language=None):
+    """Stopwords do NLTK (todas as línguas se ``language`` for None), carregadas uma vez por worker.
+
+    O nltk só é importado na primeira rota que precisar, não no boot do worker.
+    """
+    import nltk
+    from nltk.corpus import stopwords
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.append(NLTK_DATA_DIR)
+    # Baixa as stopwords do NLTK só quando não estão instaladas (no render já vêm em nltk_data)
+    try:
+        nltk.data.find('corpora/stopwords')
+    except LookupError:
+        nltk.download('stopwords', download_dir=NLTK_DATA_DIR)
+    return frozenset(stopwords.words(language) if language else stopwords.words())
+
+# Tokens alfanuméricos (equivalente ao word_tokenize + isalnum, sem o Punkt por linha)
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+def _filter_tokens(series, stop_words=frozenset()):
+    """Tokens gravados no load_books, removendo stopwords extras; linhas sem tokens viram []."""
+    return [[w for w in tokens if w not in stop_words] if tokens else [] for tokens in series]
+
+# Quantidade em estoque dentro de "In stock (19 available)"
+_AVAILABILITY_RE = re.compile(r"(\d+)")
+
+def _tokenize_column(series, stop_words):
+    """Tokeniza uma coluna de texto em minúsculas removendo stopwords; valores não-texto viram []."""
+    return [
+        [w for w in _TOKEN_RE.findall(text.lower()) if w not in stop_words] if isinstance(text, str) else []
+        for text in series
+    ]
+
+# Linhas lidas do CSV e enviadas por INSERT em lote no load_books
+LOAD_CHUNK_SIZE = 5000
+
+def backfill_tokens(chunk_size=LOAD_CHUNK_SIZE):
+    """
+    Preenche title_tokens/description_tokens dos livros carregados antes dessas colunas existirem.
 
-nltk.data.path.append(os.path.join(os.getcwd(), "nltk_data"))
+    Percorre por id só as linhas com title_tokens NULL, em lotes de ``chunk_size``.
 
-# Baixar os recursos necessários do NLTK para o render, tive que instalar de forma diferente, para ambiente local descomentar essa parte.
-#nltk.download('punkt')
-#nltk.download('stopwords')
-#nltk.download('punkt_tab') # Adicionado download de punkt_tab
+    Returns:
+        int: Quantidade de livros atualizados.
+    """
+    stop_words = _stopwords("english")
+    books = Book.__table__
+    update_stmt = books.update().where(books.c.id == bindparam('b_id')).values(
+        title_tokens=bindparam('b_title_tokens'),
+        description_tokens=bindparam('b_description_tokens'),
+    )
+    updated = 0
+    last_id = 0
+    with db.engine.begin() as conn:
+        lift_statement_timeout(conn)
+        while True:
+            rows = conn.execute(
+                select(books.c.id, books.c.title, books.c.description)
+                .where(books.c.title_tokens.is_(None), books.c.id > last_id)
+                .order_by(books.c.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            ids, titles, descriptions = zip(*rows)
+            conn.execute(update_stmt, [
+                {"b_id": book_id, "b_title_tokens": title, "b_description_tokens": description}
+                for book_id, title, description in zip(
+                    ids, _tokenize_column(titles, stop_words), _tokenize_column(descriptions, stop_words)
+                )
+            ])
+            updated += len(rows)
+            last_id = ids[-1]
+    return updated
+
+# Colunas expostas nas listagens: evita trazer description/image_url/book_url do banco
+_LIST_COLUMNS = (Book.id, Book.title, Book.category, Book.price, Book.rating, Book.upc, Book.availability)
+
+def _paginate_with_total(query, page, limit):
+    """
+    Pagina a consulta trazendo o total na mesma ida ao banco (COUNT(*) OVER()),
+    sem o SELECT COUNT(*) extra do paginate().
+
+    Returns:
+        tuple: (linhas da página, página, itens por página, total de linhas).
+    """
+    # Mesmas correções do paginate(error_out=False)
+    page = page if page >= 1 else 1
+    limit = limit if limit >= 1 else 20
+    rows = query.add_columns(func.count().over().label('total')).offset((page - 1) * limit).limit(limit).all()
+    if rows:
+        total = rows[0].total
+    else:
+        # Página além do fim: sem linhas não há total, conta à parte
+        total = query.order_by(None).count() if page > 1 else 0
+    return rows, page, limit, total
+
+# Modelo e encoder carregados uma única vez por worker, na primeira requisição de ML.
+# Enquanto o arquivo não existe (None) nada é guardado: depois de flask train-model o
+# worker passa a carregá-lo sem precisar ser reiniciado
+_ML_ARTIFACTS = {}
+
+def _load_artifact(name, loader):
+    artifact = _ML_ARTIFACTS.get(name)
+    if artifact is None:
+        artifact = loader()
+        if artifact is not None:
+            _ML_ARTIFACTS[name] = artifact
+    return artifact
+
+def _model():
+    return _load_artifact('model', ml.load_model)
+
+def _category_encoder():
+    return _load_artifact('encoder', ml.load_category_encoder)
+
+# Linhas por lote lidas do cursor do lado do servidor nas rotas de ML
+READ_CHUNK_SIZE = 5000
+
+def _read_sql_streamed(statement, bulk=False):
+    # Cursor do lado do servidor (PostgreSQL): o resultado chega em lotes em vez de ser bufferizado inteiro.
+    # Leituras da tabela inteira (bulk) não ficam sujeitas ao statement_timeout das requisições
+    with db.engine.connect().execution_options(stream_results=True, max_row_buffer=READ_CHUNK_SIZE) as conn:
+        if bulk:
+            lift_statement_timeout(conn)
+        return pd.concat(pd.read_sql(statement, conn, chunksize=READ_CHUNK_SIZE), ignore_index=True)
 
 # Cria o Blueprint
 books_bp = Blueprint('books', __name__, url_prefix='/api/v1')
@@ -86,42 +204,44 @@ def load_books():
         description: Arquivo carregado com sucesso
       400:
         description: Erro ao carregar o arquivo
+      503:
+        description: Stopwords do NLTK indisponíveis
     """
   try:
-    
-    db.session.execute(text('TRUNCATE TABLE books;'))
-    
-    df = pd.read_csv('./scraper/data/books.csv')
-    # Remove o símbolo de libra (£) e converte para float
-    df['price_numeric'] = df['price'].str.replace('£', '').astype(float)
-    # Extrai o número entre parênteses da coluna 'availability'
-    extracted_availability = df['availability'].str.extract(r'\((\d+)\s*available\)')
-    df['availability_numeric'] = extracted_availability.astype(float).fillna(0).astype(int)
-
-      # Iterate over DataFrame rows and create Book objects
-    for index, row in df.iterrows():
-        book = Book(
-            title=row['title'],
-            category=row['category'],
-            price=row['price'],
-            price_excl_tax=row['price_excl_tax'],
-            price_incl_tax=row['price_incl_tax'],
-            rating=row['rating'],
-            upc=row['upc'],
-            availability=row['availability'],
-            description=row['description'],
-            image_url=row['image_url'],
-            book_url=row['book_url'],
-            number_of_reviews=row['number_of_reviews'],
-            product_type=row['product_type'],
-            tax=row['tax'],
-            price_numeric=row['price_numeric'],
-            availability_numeric=row['availability_numeric']
-        )
-        db.session.add(book)
-
-    # Commit the session to save data to the database
-    db.session.commit()
+    columns = [c.name for c in Book.__table__.columns if c.name != 'id']
+    insert_stmt = Book.__table__.insert()
+
+    # Lê o CSV em lotes e insere cada lote no Core, numa única transação: a memória fica
+    # limitada a um lote; se algo falhar, o rollback desfaz também o TRUNCATE
+    # Sem o corpus de stopwords do NLTK (e sem rede para baixá-lo) a carga é recusada antes do
+    # TRUNCATE: gravar os tokens sem filtro deixaria as features de ML erradas
+    try:
+        stop_words = _stopwords("english")
+    except LookupError:
+        return jsonify({
+            "error": f"Stopwords do NLTK indisponíveis; instale com: python -m nltk.downloader -d {NLTK_DATA_DIR} stopwords"
+        }), 503
+
+    with db.engine.begin() as conn:
+        lift_statement_timeout(conn)
+        conn.execute(text('TRUNCATE TABLE books;'))
+        for df in pd.read_csv('./scraper/data/books.csv', chunksize=LOAD_CHUNK_SIZE):
+            # Remove o símbolo de libra (£) e converte para float
+            df['price_numeric'] = df['price'].str.replace('£', '').astype(float)
+            # Extrai o número entre parênteses da coluna 'availability'
+            extracted_availability = df['availability'].str.extract(r'\((\d+)\s*available\)')
+            df['availability_numeric'] = extracted_availability.astype(float).fillna(0).astype(int)
+
+            # Tokeniza uma única vez na carga; as rotas de ML só leem as colunas prontas
+            df['title_tokens'] = _tokenize_column(df['title'], stop_words)
+            df['description_tokens'] = _tokenize_column(df['description'], stop_words)
+
+            chunk = df[[c for c in columns if c in df.columns]]
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            conn.execute(insert_stmt, chunk.to_dict(orient='records'))
+
+    # A base mudou: descarta listagens e estatísticas em cache
+    cache.clear()
     return jsonify({"msg": "Books loaded successfully"}), 201 
   except Exception as e:
     return jsonify({"error": str(e)}), 400
@@ -150,6 +270,11 @@ def get_books():
         required: false
         default: 50
         description: Número de itens por página.
+      - name: after_id
+        in: query
+        type: integer
+        required: false
+        description: Cursor (next_cursor.after_id da resposta anterior); pagina por keyset, sem OFFSET nem total.
     responses:
       200:
         description: Lista paginada de livros.
@@ -164,6 +289,8 @@ def get_books():
               type: integer
             total_pages:
               type: integer
+            next_cursor:
+              type: object
             data:
               type: array
               items:
@@ -184,12 +311,19 @@ def get_books():
                   availability:
                     type: string
       """
-    # parâmetros de paginação (?page=1&limit=50)
+    # parâmetros de paginação (?page=1&limit=50 ou ?after_id=123&limit=50)
     page = request.args.get("page", default=1, type=int)
     limit = request.args.get("limit", default=50, type=int)
+    after_id = request.args.get("after_id", type=int)
 
-    # usa o paginate do SQLAlchemy
-    pagination = db.session.query(Book).paginate(page=page, per_page=limit, error_out=False)
+    query = db.session.query(*_LIST_COLUMNS).order_by(Book.id)
+    if after_id is not None:
+        # Keyset: continua depois do último id visto, custo O(limit) em qualquer profundidade
+        items = query.filter(Book.id > after_id).limit(max(limit, 1)).all()
+    else:
+        # usa o paginate do SQLAlchemy
+        pagination = query.paginate(page=page, per_page=limit, error_out=False)
+        items = pagination.items
 
     books = [
         {
@@ -201,19 +335,25 @@ def get_books():
             "upc": b.upc,
             "availability": b.availability,
         }
-        for b in pagination.items
+        for b in items
     ]
+    next_cursor = {"after_id": items[-1].id} if len(items) == limit else None
+
+    if after_id is not None:
+        return jsonify({"limit": limit, "next_cursor": next_cursor, "data": books})
 
     return jsonify({
         "page": page,
         "limit": limit,
         "total": pagination.total,
         "total_pages": pagination.pages,
+        "next_cursor": next_cursor,
         "data": books
     })
 
 
 @books_bp.route("books/<int:book_id>", methods=["GET"])
+@cache.cached(timeout=300, query_string=True)
 def get_book(book_id):
     """
     Busca livro pelos ID
@@ -248,6 +388,7 @@ def get_book(book_id):
     })
     
 @books_bp.route("/stats/overview", methods=["GET"])
+@cache.cached(timeout=300, query_string=True)
 def get_stats_overview():
     """
     Estatisticas gerais sobre a base de livros.
@@ -272,6 +413,7 @@ def get_stats_overview():
     })
 
 @books_bp.route("/stats/categories", methods=["GET"])
+@cache.cached(timeout=300, query_string=True)
 def get_stats_categories():
     """
     Estatisitcas detalhadas por categoria.
@@ -300,6 +442,7 @@ def get_stats_categories():
 
 
 @books_bp.route("/top-rated", methods=["GET"])
+@cache.cached(timeout=300, query_string=True)
 def get_top_rated_books():
     """
     Lista dos livros melhores avaliados.
@@ -319,29 +462,67 @@ def get_top_rated_books():
         required: false
         default: 50
         description: Número de itens por página.
+      - name: after_rating
+        in: query
+        type: integer
+        required: false
+        description: Cursor (next_cursor.after_rating da resposta anterior), usado junto com after_id.
+      - name: after_id
+        in: query
+        type: integer
+        required: false
+        description: Cursor (next_cursor.after_id da resposta anterior); pagina por keyset, sem OFFSET nem total.
     responses:
       200:
         description: Lista de livros melhores avaliados.
+      400:
+        description: Cursor inválido (after_rating e after_id devem ser inteiros e vir juntos).
     """
     page = request.args.get("page", default=1, type=int)
     limit = request.args.get("limit", default=50, type=int)
+    after_rating = request.args.get("after_rating", type=int)
+    after_id = request.args.get("after_id", type=int)
+
+    # Um cursor incompleto ou não numérico (ex.: after_rating=null) voltaria em silêncio à primeira página
+    keyset = "after_rating" in request.args or "after_id" in request.args
+    if keyset and (after_rating is None or after_id is None):
+        return jsonify({"error": "after_rating e after_id devem ser inteiros e informados juntos"}), 400
+
+    # (rating desc, id asc) coberto pelo índice ix_books_rating_desc_id. Livros sem rating ficam de
+    # fora: o keyset não os alcançaria (rating < x é NULL) e a posição dos NULLs no DESC muda com o banco
+    query = (db.session.query(*_LIST_COLUMNS)
+             .filter(Book.rating.isnot(None))
+             .order_by(Book.rating.desc(), Book.id.asc()))
+    if keyset:
+        # Keyset: continua depois do último (rating, id) visto, custo O(limit) em qualquer profundidade
+        books = query.filter(or_(
+            Book.rating < after_rating,
+            and_(Book.rating == after_rating, Book.id > after_id)
+        )).limit(max(limit, 1)).all()
+    else:
+        pagination = query.paginate(page=page, per_page=limit, error_out=False)
+        books = pagination.items
+
+    data = [{
+        "id": book.id,
+        "title": book.title,
+        "category": book.category,
+        "price": book.price,
+        "rating": book.rating,
+        "availability": book.availability,
+    } for book in books]
+    next_cursor = {"after_rating": books[-1].rating, "after_id": books[-1].id} if len(books) == limit else None
 
-    pagination = Book.query.order_by(Book.rating.desc()).paginate(page=page, per_page=limit, error_out=False)
-    books = pagination.items
+    if keyset:
+        return jsonify({"limit": limit, "next_cursor": next_cursor, "data": data})
 
     return jsonify({
         "page": pagination.page,
         "limit": pagination.per_page,
         "total": pagination.total,
         "total_pages": pagination.pages,
-        "data": [{
-            "id": book.id,
-            "title": book.title,
-            "category": book.category,
-            "price": book.price,
-            "rating": book.rating,
-            "availability": book.availability,
-        } for book in books]
+        "next_cursor": next_cursor,
+        "data": data
     })
 
 @books_bp.route("/price-range", methods=["GET"])
@@ -386,7 +567,7 @@ def get_books_by_price_range():
     limit = request.args.get("limit", default=50, type=int)
 
 
-    query = Book.query
+    query = db.session.query(*_LIST_COLUMNS)
 
     if min_price is not None:
         query = query.filter(Book.price_numeric >= min_price)
@@ -398,14 +579,13 @@ def get_books_by_price_range():
          return jsonify({"error": "Insira os dados de preço mínimo e máximo"}), 400
 
 
-    pagination = query.paginate(page=page, per_page=limit, error_out=False)
-    books = pagination.items
+    books, page, limit, total = _paginate_with_total(query, page, limit)
 
     return jsonify({
-        "page": pagination.page,
-        "limit": pagination.per_page,
-        "total": pagination.total,
-        "total_pages": pagination.pages,
+        "page": page,
+        "limit": limit,
+        "total": total,
+        "total_pages": ceil(total / limit),
         "data": [{
             "id": book.id,
             "title": book.title,
@@ -457,22 +637,21 @@ def search_books():
     page = request.args.get("page", default=1, type=int)
     limit = request.args.get("limit", default=50, type=int)
 
-    query = Book.query
+    query = db.session.query(*_LIST_COLUMNS)
 
     if title:
         query = query.filter(Book.title.ilike(f"%{title}%"))
     if category:
         query = query.filter(Book.category.ilike(f"%{category}%"))
 
-    pagination = query.paginate(page=page, per_page=limit, error_out=False)
-    books = pagination.items
+    books, page, limit, total = _paginate_with_total(query, page, limit)
 
 
     return jsonify({
-        "page": pagination.page,
-        "limit": pagination.per_page,
-        "total": pagination.total,
-        "total_pages": pagination.pages,
+        "page": page,
+        "limit": limit,
+        "total": total,
+        "total_pages": ceil(total / limit),
         "data": [{
             "id": book.id,
             "title": book.title,
@@ -484,6 +663,7 @@ def search_books():
     })
 
 @books_bp.route("/categories", methods=["GET"])
+@cache.cached(timeout=300, query_string=True)
 def get_categories():
     """
     Todas as categorias únicas de livros.
@@ -497,6 +677,15 @@ def get_categories():
     categories = db.session.query(Book.category).distinct().all()
     return jsonify([cat[0] for cat in categories])
 
+@cache.memoize(timeout=300)
+def _books_total():
+    return db.session.query(func.count(Book.id)).scalar()
+
+@cache.memoize(timeout=300)
+def _feature_categories():
+    # Mesma ordem que o OneHotEncoder usaria ajustado na tabela inteira
+    return sorted(c for (c,) in db.session.query(Book.category).distinct() if c is not None)
+
 @books_bp.route("ml/features", methods=["GET"])
 def get_features():
     """
@@ -517,6 +706,13 @@ def get_features():
         required: false
         default: 50
         description: Número de itens por página.
+      - name: format
+        in: query
+        type: string
+        required: false
+        enum: [records, columns]
+        default: records
+        description: "records: lista de objetos por livro. columns: {coluna: valores}, com a ordem em 'columns' (serializado direto dos arrays do NumPy, mais rápido para páginas grandes)."
     responses:
       200:
         description: Lista paginada de features.
@@ -525,68 +721,69 @@ def get_features():
     # parâmetros de paginação (?page=1&limit=50)
     page = request.args.get("page", default=1, type=int)
     limit = request.args.get("limit", default=50, type=int)
+    columnar = request.args.get("format") == "columns"
 
-    # Faz a query com SQLAlchemy
-    query = db.session.query(Book)
-    df = pd.read_sql(query.statement, db.engine)
-
-    # === processamento ===
-    stop_words = set(stopwords.words())
+    # Busca só a página pedida (LIMIT/OFFSET no banco); o total vem de uma contagem em cache
+    query = db.session.query(Book).order_by(Book.id).offset(max(page - 1, 0) * limit).limit(limit)
+    df = _read_sql_streamed(query.statement)
+    total = _books_total()
+    total_pages = (total + limit - 1) // limit  # arredonda pra cima
 
-    def tokenize_and_remove_stopwords(text):
-        if isinstance(text, str):
-            tokens = word_tokenize(text.lower())
-            filtered_tokens = [word for word in tokens if word.isalnum() and word not in stop_words]
-            return filtered_tokens
-        return []
+    # Página além do fim (ou tabela vazia): não há linhas para o encoder transformar
+    if df.empty:
+        return jsonify({
+            "page": page,
+            "limit": limit,
+            "total": total,
+            "total_pages": total_pages,
+            **({"columns": [], "data": {}} if columnar else {"data": []})
+        })
 
-    df['title_processed'] = df['title'].apply(tokenize_and_remove_stopwords)
-    df['description_processed'] = df['description'].apply(tokenize_and_remove_stopwords)
+    # === processamento ===
+    df['title_processed'] = _filter_tokens(df['title_tokens'], _stopwords())
+    df['description_processed'] = _filter_tokens(df['description_tokens'], _stopwords())
 
     if pd.api.types.is_string_dtype(df['availability']):
-        df['availability'] = df['availability'].apply(lambda x: int(re.search(r'\d+', x).group()))
+        df['availability'] = df['availability'].str.extract(_AVAILABILITY_RE, expand=False).fillna('0').astype(int)
 
     df['number_of_reviews'] = df['number_of_reviews'].fillna(0)
     df['price'] = df['price'].astype(str).str.replace('£', '', regex=False).astype(float)
-    df['in_stock'] = df['availability'].apply(lambda x: 1 if x > 0 else 0)
-
-    features_to_keep = ['category', 'price', 'rating', 'availability', 'in_stock', 'title_processed', 'description_processed']
-    df_processed = df[features_to_keep].copy()
+    df['in_stock'] = (df['availability'] > 0).astype(int)
 
     numerical_features = ['price', 'rating', 'availability', 'in_stock']
-    categorical_features = ['category']
     text_features = ['title_processed', 'description_processed']
 
-    preprocessor = ColumnTransformer(
-        transformers=[('cat', OneHotEncoder(handle_unknown='ignore', sparse_output=False), categorical_features)],
-        remainder='passthrough'
-    )
-
-    processed_data = preprocessor.fit_transform(df_processed)
-    onehot_feature_names = preprocessor.named_transformers_['cat'].get_feature_names_out(categorical_features)
-    category_names = [name.replace('category_', '').replace(' ', '_') for name in onehot_feature_names]
-    all_feature_names = category_names + numerical_features + text_features
+    # Encoder ajustado no train-model (sem ele, ajusta no vocabulário de categorias em cache); aqui só transform
+    encoder = _category_encoder() or ml.fit_category_encoder(_feature_categories())
+    onehot = encoder.transform(df[['category']]).astype(int)
+    category_names = [name.replace('category_', '').replace(' ', '_') for name in encoder.get_feature_names_out(['category'])]
 
-    processed_df = pd.DataFrame(processed_data, columns=all_feature_names, index=df.index)
-
-    for col in category_names + ['in_stock']:
-        if col in processed_df.columns:
-            processed_df[col] = processed_df[col].astype(int)
-
-    # === paginação ===
-    total = len(processed_df)
-    total_pages = (total + limit - 1) // limit  # arredonda pra cima
-    start = (page - 1) * limit
-    end = start + limit
-    paginated_df = processed_df.iloc[start:end]
+    processed_df = pd.concat(
+        [pd.DataFrame(onehot, columns=category_names, index=df.index), df[numerical_features + text_features]],
+        axis=1
+    )
 
     # === retorno ===
+    if columnar:
+        # Colunas numéricas vão como arrays do NumPy direto para o orjson, sem um dict por linha
+        return jsonify({
+            "page": page,
+            "limit": limit,
+            "total": total,
+            "total_pages": total_pages,
+            "columns": list(processed_df.columns),
+            "data": {
+                col: values.tolist() if values.dtype == object else np.ascontiguousarray(values)
+                for col, values in ((col, processed_df[col].to_numpy()) for col in processed_df.columns)
+            }
+        })
+
     return jsonify({
         "page": page,
         "limit": limit,
         "total": total,
         "total_pages": total_pages,
-        "data": paginated_df.to_dict(orient="records")
+        "data": processed_df.to_dict(orient="records")
     })
     
 
@@ -626,27 +823,23 @@ def training_data():
 
     # === query dos dados ===
     query = db.session.query(Book)
-    df_total = pd.read_sql(query.statement, db.engine)
+    df_total = _read_sql_streamed(query.statement, bulk=True)
+    total = len(df_total)
 
-    # === pré-processamento ===
-    stop_words = set(stopwords.words("english"))
-
-    def tokenize_and_remove_stopwords(text):
-        if isinstance(text, str):
-            tokens = word_tokenize(text.lower())
-            return [w for w in tokens if w.isalnum() and w not in stop_words]
-        return []
+    # === amostra reprodutível ===
+    # Sorteada antes do pré-processamento: tokenização e one-hot rodam só nas linhas que serão devolvidas
+    # (as mesmas linhas de antes, já que a amostra depende apenas do tamanho da tabela e do random_state)
+    df_total = df_total.sample(n=min(sample_size, total), random_state=random_state)
 
-    df_total["title_processed"] = df_total["title"].apply(tokenize_and_remove_stopwords)
-    df_total["description_processed"] = df_total["description"].apply(tokenize_and_remove_stopwords)
+    # === pré-processamento ===
+    df_total["title_processed"] = _filter_tokens(df_total["title_tokens"])
+    df_total["description_processed"] = _filter_tokens(df_total["description_tokens"])
     df_total["price"] = df_total["price"].astype(str).str.replace("£", "", regex=False).astype(float)
     
     if pd.api.types.is_string_dtype(df_total["availability"]):
-        df_total["availability"] = df_total["availability"].apply(
-            lambda x: int(re.search(r"\d+", x).group()) if re.search(r"\d+", x) else 0
-        )
+        df_total["availability"] = df_total["availability"].str.extract(_AVAILABILITY_RE, expand=False).fillna("0").astype(int)
 
-    df_total["in_stock"] = df_total["availability"].apply(lambda x: 1 if x > 0 else 0)
+    df_total["in_stock"] = (df_total["availability"] > 0).astype(int)
     df_total["number_of_reviews"] = df_total["number_of_reviews"].fillna(0)
 
     # === One-hot encoding das categorias ===
@@ -661,28 +854,20 @@ def training_data():
         "Suspense","Thriller","Travel","Womens_Fiction","Young_Adult"
     ]
 
-    # Inicializa todas as categorias com 0
-    for cat in all_categories:
-        df_total[cat] = 0
-
-    # Marca 1 na categoria real do livro (se existir)
+    # Marca 1 na categoria real do livro (se existir) e 0 nas demais, de forma vetorizada
     df_total.loc[df_total["category"].notnull(), "category"] = df_total["category"].str.strip()
-    for idx, row in df_total.iterrows():
-        cat = row["category"]
-        if cat in all_categories:
-            df_total.at[idx, cat] = 1
+    dummies = pd.get_dummies(df_total["category"], dtype="int8").reindex(columns=all_categories, fill_value=0)
+    df_total = pd.concat([df_total, dummies], axis=1)
 
     # Seleciona colunas finais
     features_to_keep = all_categories + ["availability", "description_processed",
                                          "in_stock", "price", "rating", "title_processed"]
-    df_total = df_total[features_to_keep]
-
-    # === amostra reprodutível ===
-    df = df_total.sample(n=min(sample_size, len(df_total)), random_state=random_state)
+    df = df_total[features_to_keep]
 
     # === split treino/teste ===
     X = df.drop(columns=[target_col])
     y = df[target_col]
+    from sklearn.model_selection import train_test_split
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, train_size=train_split, random_state=random_state
     )
@@ -692,12 +877,13 @@ def training_data():
         "data": pd.concat([X_train, y_train], axis=1).to_dict(orient="records"),
         "limit": sample_size,
         "page": 1,
-        "total": len(df_total),
-        "total_pages": ceil(len(df_total) / sample_size)
+        "total": total,
+        "total_pages": ceil(total / sample_size)
     }
 
     return jsonify(result)
   
+
 default_book = {
   "category": "Travel",
   "rating": 3,
@@ -708,11 +894,37 @@ default_book = {
   "description_processed": ["example", "description"]
 }
 
+def _parse_book_features(data):
+    """
+    Monta a entrada do modelo a partir do corpo, com os valores padrão para campos ausentes.
+
+    Returns:
+        dict: dados do livro, ou None se o corpo não for um objeto, a categoria não for texto
+        ou algum campo numérico não for um número finito (null, NaN, texto, booleano).
+    """
+    if not isinstance(data, dict):
+        return None
+    book_data = {k: data.get(k, v) for k, v in default_book.items()}
+    if not isinstance(book_data["category"], str):
+        return None
+    for key in ml.NUMERICAL_FEATURES:
+        value = book_data[key]
+        if isinstance(value, bool):
+            return None
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+        if not isfinite(value):
+            return None
+        book_data[key] = int(value) if value.is_integer() else value
+    return book_data
+
 
 @books_bp.route("/ml/predictions", methods=["POST"])
 def predict_price():
     """
-    Recebe dados de um livro e retorna previsão de preço (simulada).
+    Recebe dados de um livro e retorna a previsão de preço do modelo treinado.
     ---
     tags:
       - Machine Learning
@@ -760,12 +972,23 @@ def predict_price():
     responses:
       200:
         description: Predição do preço do livro
+      400:
+        description: Campos numéricos ausentes do padrão ou inválidos
+      503:
+        description: Modelo ainda não treinado
     """
 
-    data = request.get_json(force=True, silent=True) or {}
-    book_data = {k: data.get(k, v) for k, v in default_book.items()}
-    
-    predicted_price = round(random.uniform(10, 50), 2)
+    model = _model()
+    if model is None:
+        return jsonify({"error": "Modelo não treinado, execute flask train-model"}), 503
+
+    data = request.get_json(force=True, silent=True)
+    book_data = _parse_book_features({} if data is None else data)
+    if book_data is None:
+        return jsonify({"error": "Dados inválidos: category deve ser texto e rating, availability, "
+                                 "in_stock e number_of_reviews devem ser números"}), 400
+
+    predicted_price = ml.predict(model, book_data)
 
     return jsonify({
         "predicted_price": predicted_price,
@@ -1,26 +1,112 @@
+import asyncio
 import csv
+import hashlib
 import logging
+import logging.handlers
 import os
 import re
 import time
-from typing import Dict, List, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple, Union
 from urllib.parse import urljoin
 
-import requests
-from bs4 import BeautifulSoup
+import aiohttp
+from aiolimiter import AsyncLimiter
+from selectolax.lexbor import LexborHTMLParser
 
 # Configuração de logging
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# O arquivo de log é gravado em lotes de 1024 registros em vez de um write por registro.
+# Avisos e erros descarregam o lote na hora (os processos de análise não passam pelo
+# encerramento do logging); o restante é gravado quando o programa termina
+_log_file_handler = logging.FileHandler("books_scraper.log")
+_log_file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    format=LOG_FORMAT,
     handlers=[
-        logging.FileHandler("books_scraper.log"),
+        logging.handlers.MemoryHandler(capacity=1024, flushLevel=logging.WARNING, target=_log_file_handler),
         logging.StreamHandler()
     ]
 )
 logger = logging.getLogger("BooksScraper")
 
 
+def _init_parse_worker() -> None:
+    """
+    Inicializa um processo do pool de análise.
+    
+    O fork copia o buffer do MemoryHandler do processo pai; ele é descartado para que o primeiro
+    aviso do filho não grave no arquivo linhas que o pai ainda vai gravar (duplicadas no log).
+    """
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.handlers.MemoryHandler):
+            handler.acquire()
+            try:
+                handler.buffer.clear()
+            finally:
+                handler.release()
+
+# Colunas do books.csv (layout descrito no README), na ordem em que são gravadas
+CSV_FIELDNAMES = [
+    'title', 'category', 'price', 'price_excl_tax', 'price_incl_tax', 'rating', 'upc',
+    'availability', 'description', 'image_url', 'book_url', 'number_of_reviews',
+    'product_type', 'tax'
+]
+
+# Classe de estrelas (ex: 'star-rating Four') -> classificação numérica
+_RATING_MAP = {'One': 1, 'Two': 2, 'Three': 3, 'Four': 4, 'Five': 5}
+
+# Valor numérico de um preço (ex: '£51.77' -> '51.77'), independente do símbolo da moeda
+_PRICE_RE = re.compile(r'\d+(?:\.\d+)?')
+
+# Mapeamento dos cabeçalhos da tabela de detalhes para chaves padronizadas
+_HEADER_MAP = {
+    'UPC': 'upc',
+    'Product Type': 'product_type',
+    'Price (excl. tax)': 'price_excl_tax',
+    'Price (incl. tax)': 'price_incl_tax',
+    'Tax': 'tax',
+    'Availability': 'availability',
+    'Number of reviews': 'number_of_reviews'
+}
+_FLOAT_KEYS = frozenset({'price_excl_tax', 'price_incl_tax', 'tax'})
+
+# Trecho das páginas de listagem que contém os livros (ol.row) e a paginação (ul.pager);
+# cabeçalho, menu de categorias e rodapé ficam de fora do parse
+_LISTING_BOUNDS = (b'<section>', b'</section>')
+
+# Total de páginas da categoria na paginação (ex: 'Page 1 of 50')
+_PAGE_COUNT_RE = re.compile(r'of\s+(\d+)')
+
+# Novas tentativas para erros transitórios do servidor/rede, com espera de 0.5s, 1s, 2s
+_RETRY_STATUSES = {500, 502, 503, 504}
+_MAX_RETRIES = 3
+_BACKOFF_FACTOR = 0.5
+
+
+def _subtree(content: bytes, bounds: Tuple[bytes, bytes]) -> bytes:
+    """
+    Recorta do HTML o trecho entre as tags de início e fim informadas.
+    
+    Args:
+        content: HTML da página.
+        bounds: Tags de início e fim do trecho.
+        
+    Returns:
+        bytes: Trecho recortado, ou a página inteira se as tags não forem encontradas.
+    """
+    start_tag, end_tag = bounds
+    start = content.find(start_tag)
+    end = content.rfind(end_tag)
+    if start == -1 or end < start:
+        return content
+    return content[start:end + len(end_tag)]
+
+
 class BooksScraper:
     """
     Classe responsável por extrair dados de livros do site Books to Scrape.
@@ -30,55 +116,164 @@ class BooksScraper:
     
     Attributes:
         base_url (str): URL base do site Books to Scrape.
-        session (requests.Session): Sessão HTTP para fazer requisições.
+        session (aiohttp.ClientSession): Sessão HTTP assíncrona, aberta durante scrape_all_books.
+        concurrency (int): Máximo de requisições simultâneas ao site.
+        rate_limit (float): Máximo de requisições por segundo ao site (0 desativa o limite).
+        cache_dir (Optional[str]): Pasta do cache em disco das páginas baixadas (None desativa).
+        cache_expire (int): Validade, em segundos, de uma página no cache.
+        parse_workers (int): Processos usados para analisar as páginas de detalhes (0 analisa no
+            próprio processo).
         categories (List[Dict]): Lista de categorias extraídas.
         books (List[Dict]): Lista de livros extraídos com todos os detalhes.
         extract_detailed_info (bool): Se True, extrai informações detalhadas
             das páginas individuais de cada livro.
     """
     
-    def __init__(self, extract_detailed_info: bool = True) -> None:
+    def __init__(self, extract_detailed_info: bool = True, concurrency: int = 10, rate_limit: float = 20,
+                 cache_dir: Optional[str] = '.cache', cache_expire: int = 86400,
+                 parse_workers: Optional[int] = None) -> None:
         """
         Inicializa o scraper com valores padrão.
         
         Args:
             extract_detailed_info: Se True, o scraper extrairá informações
                 detalhadas das páginas individuais de cada livro.
+            concurrency: Máximo de requisições simultâneas ao site.
+            rate_limit: Máximo de requisições por segundo ao site; 0 desativa o limite.
+            cache_dir: Pasta do cache em disco das páginas baixadas; None desativa o cache.
+            cache_expire: Validade, em segundos, de uma página no cache.
+            parse_workers: Processos usados para analisar as páginas de detalhes; None usa um
+                por CPU e 0 analisa no próprio processo.
         """
         self.base_url = "https://books.toscrape.com/"
-        self.session = requests.Session()
+        self.session: Optional[aiohttp.ClientSession] = None
         
         # Adiciona um User-Agent para simular um navegador comum
-        self.session.headers.update({
+        self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        }
+        self.concurrency = concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.rate_limit = rate_limit
+        self._rate_limiter: Optional[AsyncLimiter] = None
+        self._csv_writer: Optional[csv.DictWriter] = None
+        self._csv_file = None
+        self._books_written = 0
+        self.cache_dir = cache_dir
+        self.cache_expire = cache_expire
+        self.parse_workers = os.cpu_count() if parse_workers is None else parse_workers
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
         
         self.categories = []
         self.books = []
         self.extract_detailed_info = extract_detailed_info
+        # URLs de livros já extraídos na execução atual
+        self._seen_urls = set()
+    
+    def _cache_path(self, url: str) -> str:
+        # Um arquivo por URL: SHA1 da URL como nome
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.html')
     
-    def get_soup(self, url: str) -> Optional[BeautifulSoup]:
+    def _read_cache(self, url: str) -> Optional[bytes]:
         """
-        Retorna um objeto BeautifulSoup para a URL fornecida.
+        Retorna o conteúdo da URL salvo no cache em disco, se existir e ainda estiver válido.
         
         Args:
-            url: URL da página a ser analisada.
+            url: URL da página.
             
         Returns:
-            BeautifulSoup: Objeto BeautifulSoup da página ou None se ocorrer erro.
-            
-        Raises:
-            requests.exceptions.RequestException: Se houver problemas na requisição HTTP.
+            bytes: Conteúdo da página ou None se não houver cache válido.
         """
+        if not self.cache_dir:
+            return None
+        
+        path = self._cache_path(url)
         try:
-            response = self.session.get(url)
-            response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Erro ao acessar {url}: {e}")
+            if time.time() - os.path.getmtime(path) > self.cache_expire:
+                return None
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def _write_cache(self, url: str, content: bytes) -> None:
+        if not self.cache_dir:
+            return
+        
+        path = self._cache_path(url)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Grava num temporário e renomeia: uma execução interrompida não deixa página truncada no cache
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar {url} no cache: {e}")
+    
+    async def fetch_bytes(self, url: str) -> Optional[bytes]:
+        """
+        Retorna o conteúdo bruto da URL fornecida.
+        
+        Páginas presentes no cache em disco (``cache_dir``) não são baixadas de novo;
+        as demais são baixadas com no máximo ``concurrency`` requisições simultâneas
+        e ``rate_limit`` requisições por segundo, repetindo a requisição em erros transitórios (5xx, conexão, timeout).
+        
+        Args:
+            url: URL da página.
+            
+        Returns:
+            bytes: Conteúdo da página ou None se ocorrer erro.
+        """
+        content = self._read_cache(url)
+        if content is not None:
+            return content
+        
+        for attempt in range(_MAX_RETRIES + 1):
+            try:
+                # Limite global de requisições por segundo (token bucket) no lugar de pausas fixas:
+                # a cortesia com o site vale para o conjunto das requisições, não para cada uma
+                if self._rate_limiter:
+                    await self._rate_limiter.acquire()
+                async with self._semaphore:
+                    async with self.session.get(url) as response:
+                        response.raise_for_status()
+                        content = await response.read()
+                break
+            except aiohttp.ClientResponseError as e:
+                error, retry = e, e.status in _RETRY_STATUSES
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error, retry = e, True
+            except aiohttp.ClientError as e:
+                error, retry = e, False
+            
+            if not retry or attempt == _MAX_RETRIES:
+                logger.error(f"Erro ao acessar {url}: {error}")
+                return None
+            
+            # Espera fora do semáforo: a vaga fica livre para outras requisições
+            await asyncio.sleep(_BACKOFF_FACTOR * 2 ** attempt)
+        
+        self._write_cache(url, content)
+        return content
+    
+    async def get_soup(self, url: str, bounds: Optional[Tuple[bytes, bytes]] = None) -> Optional[LexborHTMLParser]:
+        """
+        Retorna a árvore HTML (selectolax/Lexbor) para a URL fornecida.
+        
+        Args:
+            url: URL da página a ser analisada.
+            bounds: Tags de início e fim do único trecho da página que deve ser analisado.
+            
+        Returns:
+            LexborHTMLParser: Árvore HTML da página ou None se ocorrer erro.
+        """
+        content = await self.fetch_bytes(url)
+        if content is None:
             return None
+        return LexborHTMLParser(_subtree(content, bounds) if bounds else content)
     
-    def extract_categories(self) -> List[Dict[str, str]]:
+    async def extract_categories(self) -> List[Dict[str, str]]:
         """
         Extrai todas as categorias disponíveis no site.
         
@@ -90,14 +285,14 @@ class BooksScraper:
                 Cada dicionário tem as chaves 'name' e 'url'.
         """
         logger.info("Extraindo categorias...")
-        soup = self.get_soup(self.base_url)
+        soup = await self.get_soup(self.base_url)
         
         if not soup:
             logger.error("Não foi possível obter a página inicial")
             return []
         
         # Localiza o menu lateral de categorias
-        category_container = soup.select_one('div.side_categories > ul.nav > li > ul')
+        category_container = soup.css_first('div.side_categories > ul.nav > li > ul')
         
         if not category_container:
             logger.error("Não foi possível encontrar o menu de categorias")
@@ -107,11 +302,11 @@ class BooksScraper:
         self.categories = []
         
         # Extrai os links de categoria
-        for category_item in category_container.find_all('li'):
-            link_tag = category_item.find('a')
+        for category_item in category_container.css('li'):
+            link_tag = category_item.css_first('a')
             if link_tag:
-                category_name = link_tag.text.strip()
-                category_url = urljoin(self.base_url, link_tag['href'])
+                category_name = link_tag.text().strip()
+                category_url = urljoin(self.base_url, link_tag.attributes['href'])
                 self.categories.append({
                     'name': category_name,
                     'url': category_url
@@ -120,7 +315,8 @@ class BooksScraper:
         logger.info(f"Total de categorias encontradas: {len(self.categories)}")
         return self.categories
     
-    def extract_rating(self, star_element) -> int:
+    @staticmethod
+    def extract_rating(star_element) -> int:
         """
         Converte a classificação em estrelas para um valor numérico.
         
@@ -131,30 +327,24 @@ class BooksScraper:
             int: Classificação numérica de 1 a 5, ou 0 se não for possível extrair.
         """
         if not star_element:
-            print("sem star_element")
             return 0
         
         # Obtém as classes do elemento
-        classes = star_element.get('class', [])
+        classes = (star_element.attributes.get('class') or '').split()
 
-        # Procura pela classe que indica a classificação de estrelas       
+        # A classificação é a última palavra da classe (ex: 'star-rating Four'); 0 se não encontrada
         if 'star-rating' in classes:
-            # A parte da classificação é a última palavra na classe 
-            rating_value = classes[-1]  # Ex: 'Four'
-            return {
-                'One': 1,
-                'Two': 2,
-                'Three': 3,
-                'Four': 4,
-                'Five': 5
-            }.get(rating_value, 0)  # Retorna valor correspondente ou 0 se não encontrado
+            return _RATING_MAP.get(classes[-1], 0)
         
-        return 0  # Se não encontrou classificação
+        return 0
 
 
-    def extract_book_details(self, book_url: str) -> Dict[str, Union[str, int, float]]:
+    async def extract_book_details(self, book_url: str) -> Dict[str, Union[str, int, float]]:
         """
         Extrai detalhes adicionais de uma página individual de livro.
+        
+        O download roda no event loop; a análise do HTML vai para o pool de processos
+        (``parse_workers``), fora do GIL.
 
         Args:
             book_url: URL da página detalhada do livro.
@@ -162,102 +352,67 @@ class BooksScraper:
         Returns:
             Dict[str, Union[str, int, float]]: Dicionário com os detalhes completos do livro.
         """
-        soup = self.get_soup(book_url)
+        content = await self.fetch_bytes(book_url)
 
-        if not soup:
+        if content is None:
             logger.error(f"Não foi possível obter a página de detalhes: {book_url}")
             return {}
 
-        # Dicionário para armazenar todos os detalhes do livro
-        book_details = {}
-
+        # Uma página que não pôde ser analisada fica só com as informações da listagem, sem
+        # derrubar o gather da categoria (e com ele a execução inteira)
         try:
-            # Extrai o título
-            title_element = soup.select_one('div.product_main h1')
-            if title_element:
-                book_details['title'] = title_element.text.strip()
-
-            # Extrai a descrição do produto
-            product_description = soup.select_one('#product_description ~ p')
-            book_details['description'] = product_description.text.strip() if product_description else "Sem descrição"
-
-            # Extrai informações da tabela de detalhes
-            info_table = soup.select_one('table.table-striped')
-            if info_table:
-                rows = info_table.select('tr')
-                for row in rows:
-                    header = row.select_one('th').text.strip()
-                    value = row.select_one('td').text.strip()
-
-                    # Mapeamento para chaves padronizadas
-                    header_mapping = {
-                        'UPC': 'upc',
-                        'Product Type': 'product_type',
-                        'Price (excl. tax)': 'price_excl_tax',
-                        'Price (incl. tax)': 'price_incl_tax',
-                        'Tax': 'tax',
-                        'Availability': 'availability',
-                        'Number of reviews': 'number_of_reviews'
-                    }
-
-                    if header in header_mapping:
-                        key = header_mapping[header]
-                        if key in ['price_excl_tax', 'price_incl_tax', 'tax']:
-                            book_details[key] = float(value.replace('£', ''))  # Converte para float
-                        elif key == 'number_of_reviews':
-                            book_details[key] = int(value)  # Captura o número de avaliações
-                        else:
-                            book_details[key] = value
-
-            # URL da imagem em alta resolução
-            image_div = soup.select_one('#product_gallery img')
-            if image_div:
-                relative_image_url = image_div.get('src')
-                book_details['image_url'] = urljoin(self.base_url, relative_image_url)
-
-            # Extrai a classificação (rating)
-            rating_element = soup.select_one('p.star-rating')
-            if rating_element:
-                book_details['rating'] = self.extract_rating(rating_element)
-            else:
-                logger.warning(f"Rating não encontrado para o livro {book_url}")
-                book_details['rating'] = 0
-
+            return await self._parse_book_details(content, book_url)
         except Exception as e:
-            logger.error(f"Erro ao extrair detalhes do livro {book_url}: {e}", exc_info=True)
-
-        return book_details
+            logger.warning(f"Erro ao analisar a página de detalhes {book_url}: {e}")
+            return {}
+    
+    async def _parse_book_details(self, content: bytes, book_url: str) -> Dict[str, Union[str, int, float]]:
+        """
+        Analisa a página de detalhes no pool de processos, ou no próprio processo sem pool.
         
+        Um processo filho morto quebra o pool inteiro: ele é recriado uma única vez (as páginas
+        que estavam na fila falham juntas) e a página é analisada no próprio processo.
+        """
+        pool = self._parse_pool
+        if not pool:
+            return parse_book_details(content, book_url, self.base_url)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, parse_book_details, content, book_url, self.base_url)
+        except BrokenProcessPool:
+            if self._parse_pool is pool:
+                logger.warning("Pool de análise quebrado (processo filho encerrado); recriando")
+                pool.shutdown(wait=False, cancel_futures=True)
+                self._parse_pool = self._new_parse_pool()
+            return parse_book_details(content, book_url, self.base_url)
     
-    def extract_books_from_page(self, url: str, category_name: str) -> List[Dict[str, Union[str, int, float]]]:
+    def _new_parse_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.parse_workers, initializer=_init_parse_worker)
+        
+    
+    def _parse_listing(self, soup: LexborHTMLParser, url: str, category_name: str) -> List[Dict[str, Union[str, int, float]]]:
         """
-        Extrai todos os livros de uma página específica.
+        Extrai as informações básicas dos livros de uma página de listagem já baixada.
         
         Args:
-            url: URL da página.
+            soup: Árvore HTML da página de listagem.
+            url: URL da página (base para os links relativos).
             category_name: Nome da categoria dos livros.
             
         Returns:
-            List[Dict[str, Union[str, int, float]]]: Lista de livros extraídos da página,
-                cada livro representado como um dicionário de atributos.
+            List[Dict[str, Union[str, int, float]]]: Informações básicas de cada livro listado.
         """
-        page_books = []
-        soup = self.get_soup(url)
-        
-        if not soup:
-            logger.error(f"Falha ao obter a página {url}")
-            return []
-        
-        book_containers = soup.select('article.product_pod')
+        listed_books = []
+        book_containers = soup.css('article.product_pod')
         
         for book in book_containers:
             try:
                 # Extrai o título
-                title_element = book.select_one('h3 > a')
-                title = title_element.get('title', '').strip() if title_element else 'Sem título'
+                title_element = book.css_first('h3 > a')
+                title = (title_element.attributes.get('title') or '').strip() if title_element else 'Sem título'
                 
                 # URL do livro para detalhes adicionais
-                book_url = urljoin(url, title_element.get('href')) if title_element else None
+                book_url = urljoin(url, title_element.attributes.get('href')) if title_element else None
                 
                 # Obtém informações básicas da página de listagem
                 basic_info = {
@@ -267,37 +422,103 @@ class BooksScraper:
                 }
                 
                 # Extrai o preço
-                price_element = book.select_one('div.product_price p.price_color')
+                price_element = book.css_first('div.product_price p.price_color')
                 if price_element:
-                    basic_info['price'] = price_element.text.strip()
+                    basic_info['price'] = price_element.text().strip()
                 
                 # Extrai a classificação (rating)
-                rating_element = book.select_one('p.star-rating')
+                rating_element = book.css_first('p.star-rating')
                 if rating_element:
                     basic_info['rating'] = self.extract_rating(rating_element)
                 
-                # Visita a página de detalhes do livro para extrair mais informações
                 if book_url:
-                    logger.debug(f"Extraindo detalhes do livro: {title}")
-                    detailed_info = self.extract_book_details(book_url)
-                    
-                    # Combina as informações básicas com os detalhes
-                    book_info = {**basic_info, **detailed_info}
-                    
-                    page_books.append(book_info)
-                    
-                    # Pausa breve entre requisições de páginas de detalhes
-                    time.sleep(0.2)
+                    listed_books.append(basic_info)
             
             except Exception as e:
                 logger.warning(f"Erro ao extrair livro: {e}")
         
-        return page_books
+        return listed_books
+    
+    async def extract_books_from_page(self, soup: LexborHTMLParser, url: str, category_name: str) -> List[Dict[str, Union[str, int, float]]]:
+        """
+        Extrai todos os livros de uma página de listagem já baixada.
+        
+        As páginas de detalhes dos livros da página são baixadas em paralelo, apenas no modo
+        detalhado. Livros já extraídos nesta execução (mesma URL) são ignorados.
+        
+        Args:
+            soup: Árvore HTML da página de listagem.
+            url: URL da página.
+            category_name: Nome da categoria dos livros.
+            
+        Returns:
+            List[Dict[str, Union[str, int, float]]]: Lista de livros extraídos da página,
+                cada livro representado como um dicionário de atributos.
+        """
+        listed_books = []
+        for book in self._parse_listing(soup, url, category_name):
+            if book['book_url'] not in self._seen_urls:
+                self._seen_urls.add(book['book_url'])
+                listed_books.append(book)
+        
+        # No modo simples (--simple) ficam só as informações da listagem, sem baixar os detalhes
+        if not self.extract_detailed_info:
+            return listed_books
+        
+        # Visita as páginas de detalhes de todos os livros da página ao mesmo tempo
+        details = await asyncio.gather(*(self.extract_book_details(book['book_url']) for book in listed_books))
+        
+        # Combina as informações básicas com os detalhes (no próprio dicionário da listagem)
+        for basic_info, detailed_info in zip(listed_books, details):
+            basic_info.update(detailed_info)
+        return listed_books
     
-    def extract_books_from_category(self, category: Dict[str, str]) -> List[Dict[str, Union[str, int, float]]]:
+    async def _extract_listing_page(self, page_url: str, page_num: int, category_name: str,
+                                    soup: Optional[LexborHTMLParser] = None) -> Tuple[int, List[Dict[str, Union[str, int, float]]]]:
+        """
+        Extrai os livros de uma página de listagem de categoria.
+        
+        Args:
+            page_url: URL da página de listagem.
+            page_num: Número da página (usado nas mensagens de log).
+            category_name: Nome da categoria dos livros.
+            soup: Árvore da página, se já tiver sido baixada.
+            
+        Returns:
+            Tuple[int, List[Dict[str, Union[str, int, float]]]]: Quantidade de livros extraídos e
+                os livros a manter em memória (vazia quando foram gravados direto no CSV).
+        """
+        logger.info(f"  Processando página {page_num} da categoria {category_name}...")
+        
+        if soup is None:
+            soup = await self.get_soup(page_url, bounds=_LISTING_BOUNDS)
+            if not soup:
+                logger.error(f"Falha ao obter a página {page_url}")
+                return 0, []
+        
+        page_books = await self.extract_books_from_page(soup, page_url, category_name)
+        
+        if not page_books:
+            logger.warning(f"  Não foram encontrados livros na página {page_num} da categoria {category_name}")
+            return 0, []
+        
+        if self._csv_writer:
+            # Grava a página assim que termina: os livros não ficam acumulados em memória
+            # e o que já foi extraído sobrevive a uma falha no meio da execução
+            self._csv_writer.writerows(page_books)
+            self._csv_file.flush()
+            self._books_written += len(page_books)
+            return len(page_books), []
+        
+        return len(page_books), page_books
+    
+    async def extract_books_from_category(self, category: Dict[str, str]) -> List[Dict[str, Union[str, int, float]]]:
         """
         Extrai todos os livros de uma categoria, incluindo paginação.
         
+        O total de páginas é lido da paginação da primeira página ('Page 1 of N'), e as
+        demais páginas são baixadas em paralelo em vez de seguindo o link 'next' uma a uma.
+        
         Args:
             category: Dicionário contendo nome e URL da categoria.
             
@@ -305,70 +526,101 @@ class BooksScraper:
             List[Dict[str, Union[str, int, float]]]: Lista de livros extraídos da categoria.
         """
         logger.info(f"Extraindo livros da categoria: {category['name']}...")
-        category_books = []
-        page_url = category['url']
-        page_num = 1
         
-        while True:
-            logger.info(f"  Processando página {page_num} da categoria {category['name']}...")
-            page_books = self.extract_books_from_page(page_url, category['name'])
-            
-            if not page_books:
-                logger.warning(f"  Não foram encontrados livros na página {page_num} da categoria {category['name']}")
-                break
-                
+        # A primeira página é baixada uma única vez: livros e total de páginas saem da mesma árvore
+        first_page = await self.get_soup(category['url'], bounds=_LISTING_BOUNDS)
+        if not first_page:
+            logger.error(f"Falha ao obter a página {category['url']}")
+            return []
+        
+        # Categorias com uma única página não têm paginação
+        current = first_page.css_first('li.current')
+        match = _PAGE_COUNT_RE.search(current.text()) if current else None
+        page_count = int(match.group(1)) if match else 1
+        
+        results = await asyncio.gather(
+            self._extract_listing_page(category['url'], 1, category['name'], soup=first_page),
+            *(self._extract_listing_page(urljoin(category['url'], f'page-{page_num}.html'), page_num, category['name'])
+              for page_num in range(2, page_count + 1))
+        )
+        
+        category_books = []
+        category_count = 0
+        for books_found, page_books in results:
+            category_count += books_found
             category_books.extend(page_books)
-            
-            # Verifica se existe próxima página
-            soup = self.get_soup(page_url)
-            if not soup:
-                break
-                
-            next_button = soup.select_one('li.next > a')
-            
-            if not next_button:
-                logger.info(f"  Última página da categoria {category['name']} alcançada")
-                break
-                
-            # Atualiza a URL para a próxima página
-            page_url = urljoin(page_url, next_button['href'])
-            page_num += 1
-            
-            # Pausa breve para evitar sobrecarregar o servidor
-            time.sleep(0.5)
         
-        logger.info(f"  Encontrados {len(category_books)} livros na categoria {category['name']}")
+        logger.info(f"  Encontrados {category_count} livros na categoria {category['name']}")
         return category_books
     
-    def scrape_all_books(self) -> List[Dict[str, Union[str, int, float]]]:
+    def scrape_all_books(self, output: Optional[str] = None) -> List[Dict[str, Union[str, int, float]]]:
         """
         Extrai todos os livros de todas as categorias.
         
         Este método coordena o processo completo de extração, primeiro obtendo
-        todas as categorias e depois extraindo livros de cada uma delas.
+        todas as categorias e depois extraindo livros de cada uma delas. As
+        requisições rodam em paralelo (asyncio + aiohttp), limitadas a
+        ``concurrency`` simultâneas.
+        
+        Args:
+            output: Se informado, cada página de livros é gravada neste CSV assim que
+                termina, sem acumular os livros em ``self.books``.
         
         Returns:
-            List[Dict[str, Union[str, int, float]]]: Lista com todos os livros do site.
+            List[Dict[str, Union[str, int, float]]]: Lista com todos os livros do site
+                (vazia quando os livros são gravados direto em ``output``).
         """
-        logger.info("Iniciando extração de todos os livros...")
+        if not output:
+            return asyncio.run(self._scrape_all_books())
         
-        # Primeiro obtém todas as categorias
-        self.extract_categories()
-        
-        # Limpa a lista de livros para evitar duplicações em execuções repetidas
-        self.books = []
-        
-        # Em seguida, extrai os livros de cada categoria
-        for i, category in enumerate(self.categories, 1):
-            logger.info(f"Processando categoria {i}/{len(self.categories)}: {category['name']}")
-            category_books = self.extract_books_from_category(category)
-            self.books.extend(category_books)
-            
-            # Pausa entre categorias para não sobrecarregar o servidor
-            if i < len(self.categories):
-                time.sleep(1)
+        with open(output, 'w', newline='', encoding='utf-8') as csvfile:
+            self._csv_file = csvfile
+            self._csv_writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDNAMES, extrasaction='ignore')
+            self._csv_writer.writeheader()
+            try:
+                return asyncio.run(self._scrape_all_books())
+            finally:
+                self._csv_writer = None
+                self._csv_file = None
+    
+    async def _scrape_all_books(self) -> List[Dict[str, Union[str, int, float]]]:
+        logger.info("Iniciando extração de todos os livros...")
         
-        logger.info(f"Extração concluída! Total de livros extraídos: {len(self.books)}")
+        # Conexões keep-alive reaproveitadas entre as requisições: o semáforo nunca deixa mais de
+        # ``concurrency`` requisições em andamento, então o pool do mesmo tamanho não abre conexões
+        # extras; o DNS do site é resolvido uma vez só
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=30, connect=10)
+        async with aiohttp.ClientSession(headers=self.headers, connector=connector, timeout=timeout) as session:
+            self.session = session
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            if self.rate_limit:
+                self._rate_limiter = AsyncLimiter(self.rate_limit, time_period=1)
+            # Processos para a análise das páginas de detalhes (CPU), em paralelo aos downloads
+            if self.parse_workers:
+                self._parse_pool = self._new_parse_pool()
+            try:
+                # Primeiro obtém todas as categorias
+                await self.extract_categories()
+                
+                # Limpa a lista de livros para evitar duplicações em execuções repetidas
+                self.books = []
+                self._books_written = 0
+                self._seen_urls = set()
+                
+                # Em seguida, extrai os livros de todas as categorias em paralelo (na ordem das categorias)
+                results = await asyncio.gather(*(self.extract_books_from_category(category) for category in self.categories))
+                for category_books in results:
+                    self.books.extend(category_books)
+            finally:
+                self.session = None
+                self._semaphore = None
+                self._rate_limiter = None
+                if self._parse_pool:
+                    self._parse_pool.shutdown()
+                    self._parse_pool = None
+        
+        logger.info(f"Extração concluída! Total de livros extraídos: {len(self.books) + self._books_written}")
         return self.books
     
     def save_to_csv(self, filename: str = "books.csv") -> None:
@@ -386,33 +638,10 @@ class BooksScraper:
             return
         
         try:
-            # Define os campos que serão exportados, priorizando campos detalhados se disponíveis
-            all_fields = set()
-            for book in self.books:
-                all_fields.update(book.keys())
-            
-            # Ordena os campos para ter uma ordem consistente
-            fieldnames = sorted(list(all_fields))
-            
-            # Prioriza campos importantes no início do CSV
-            priority_fields = [
-                'title', 'category', 'price', 'price_excl_tax', 'price_incl_tax', 
-                'rating', 'upc', 'availability', 'availability_detail', 'stock_quantity',
-                'description', 'image_url', 'book_url'
-            ]
-            
-            # Move os campos prioritários para o início
-            for field in reversed(priority_fields):
-                if field in fieldnames:
-                    fieldnames.remove(field)
-                    fieldnames.insert(0, field)
-            
             with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDNAMES, extrasaction='ignore')
                 writer.writeheader()
-                
-                for book in self.books:
-                    writer.writerow(book)
+                writer.writerows(self.books)
                 
             logger.info(f"Dados salvos com sucesso em {filename}")
         except Exception as e:
@@ -420,6 +649,75 @@ class BooksScraper:
             raise
 
 
+def parse_book_details(content: bytes, book_url: str, base_url: str) -> Dict[str, Union[str, int, float]]:
+    """
+    Extrai os detalhes de um livro do HTML da sua página.
+    
+    Função pura (bytes -> dict), para poder rodar num ProcessPoolExecutor.
+    
+    Args:
+        content: HTML da página detalhada do livro.
+        book_url: URL da página (usada nas mensagens de log).
+        base_url: URL base do site, para resolver a URL da imagem.
+        
+    Returns:
+        Dict[str, Union[str, int, float]]: Dicionário com os detalhes completos do livro.
+    """
+    soup = LexborHTMLParser(content)
+    
+    # Dicionário para armazenar todos os detalhes do livro
+    book_details = {}
+
+    try:
+        # Extrai o título
+        title_element = soup.css_first('div.product_main h1')
+        if title_element:
+            book_details['title'] = title_element.text().strip()
+
+        # Extrai a descrição do produto
+        product_description = soup.css_first('#product_description ~ p')
+        book_details['description'] = product_description.text().strip() if product_description else "Sem descrição"
+
+        # Extrai informações da tabela de detalhes
+        info_table = soup.css_first('table.table-striped')
+        if info_table:
+            # Duas consultas para a tabela inteira em vez de duas por linha:
+            # cada th é pareado com o td da mesma linha
+            headers = info_table.css('th')
+            values = info_table.css('td')
+            for header_element, value_element in zip(headers, values):
+                header = header_element.text().strip()
+                value = value_element.text().strip()
+
+                key = _HEADER_MAP.get(header)
+                if key:
+                    if key in _FLOAT_KEYS:
+                        book_details[key] = float(_PRICE_RE.search(value).group())  # Converte para float
+                    elif key == 'number_of_reviews':
+                        book_details[key] = int(value)  # Captura o número de avaliações
+                    else:
+                        book_details[key] = value
+
+        # URL da imagem em alta resolução
+        image_div = soup.css_first('#product_gallery img')
+        if image_div:
+            relative_image_url = image_div.attributes.get('src')
+            book_details['image_url'] = urljoin(base_url, relative_image_url)
+
+        # Extrai a classificação (rating)
+        rating_element = soup.css_first('p.star-rating')
+        if rating_element:
+            book_details['rating'] = BooksScraper.extract_rating(rating_element)
+        else:
+            logger.warning(f"Rating não encontrado para o livro {book_url}")
+            book_details['rating'] = 0
+
+    except Exception as e:
+        logger.error(f"Erro ao extrair detalhes do livro {book_url}: {e}", exc_info=True)
+
+    return book_details
+
+
 def main() -> None:
     """
     Função principal que executa o processo completo de web scraping.
@@ -434,6 +732,16 @@ def main() -> None:
                         help='Extrai apenas informações básicas (mais rápido)')
     parser.add_argument('--output', type=str, default='books.csv',
                         help='Nome do arquivo CSV de saída')
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='Máximo de requisições simultâneas ao site')
+    parser.add_argument('--rate-limit', type=float, default=20,
+                        help='Máximo de requisições por segundo ao site (0 desativa)')
+    parser.add_argument('--cache-dir', type=str, default='.cache',
+                        help='Pasta do cache em disco das páginas baixadas')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Baixa todas as páginas novamente, sem usar o cache em disco')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help='Processos para analisar as páginas de detalhes (padrão: um por CPU; 0 desativa)')
     args = parser.parse_args()
     
     try:
@@ -441,7 +749,13 @@ def main() -> None:
         
         # Cria o scraper com configuração baseada nos argumentos
         extract_detailed = not args.simple
-        scraper = BooksScraper(extract_detailed_info=extract_detailed)
+        scraper = BooksScraper(
+            extract_detailed_info=extract_detailed,
+            concurrency=args.concurrency,
+            rate_limit=args.rate_limit,
+            cache_dir=None if args.no_cache else args.cache_dir,
+            parse_workers=args.parse_workers
+        )
         
         if extract_detailed:
             logger.info("Modo detalhado: extraindo informações completas de cada livro (pode ser lento)")
@@ -449,8 +763,8 @@ def main() -> None:
             logger.info("Modo simples: extraindo apenas informações básicas de cada livro")
         
         # Executa o scraping e salva os resultados
-        scraper.scrape_all_books()
-        scraper.save_to_csv(args.output)
+        # Os livros são gravados no CSV à medida que cada página termina
+        scraper.scrape_all_books(output=args.output)
         
         logger.info(f"Web scraping concluído com sucesso! Resultados salvos em {args.output}")
     except Exception as e:
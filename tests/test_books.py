@@ -0,0 +1,120 @@
+import os
+import unittest
+from unittest import mock
+
+# Banco SQLite em memória e parâmetros do Argon2 fixos, definidos antes do import da aplicação
+os.environ.setdefault("ARGON2_PARAMS", "1,8192")
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+
+from app import create_app
+from database import db
+from models import Book
+from routes.books import backfill_tokens
+
+
+class FeaturesTest(unittest.TestCase):
+    """/api/v1/ml/features com páginas sem linhas."""
+
+    def setUp(self):
+        self.app = create_app()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(Book(title="A", category="Travel", price="£10.00", rating=3, availability="In stock (2 available)"))
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_page_past_the_end_returns_empty_data(self):
+        response = self.client.get("/api/v1/ml/features?page=500&limit=50")
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body["data"], [])
+        self.assertEqual(body["total"], 1)
+
+    def test_page_past_the_end_columnar(self):
+        response = self.client.get("/api/v1/ml/features?page=500&limit=50&format=columns")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["data"], {})
+
+
+class TopRatedTest(unittest.TestCase):
+    """/api/v1/top-rated com livros sem rating e cursores inválidos."""
+
+    def setUp(self):
+        self.app = create_app()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add_all([
+            Book(title="A", rating=5),
+            Book(title="B", rating=None),
+            Book(title="C", rating=3),
+            Book(title="D", rating=3),
+        ])
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_keyset_pages_skip_null_ratings(self):
+        first = self.client.get("/api/v1/top-rated?limit=2").get_json()
+        self.assertEqual([b["title"] for b in first["data"]], ["A", "C"])
+        self.assertEqual(first["total"], 3)
+        cursor = first["next_cursor"]
+        second = self.client.get(
+            f"/api/v1/top-rated?limit=2&after_rating={cursor['after_rating']}&after_id={cursor['after_id']}"
+        ).get_json()
+        self.assertEqual([b["title"] for b in second["data"]], ["D"])
+        self.assertIsNone(second["next_cursor"])
+
+    def test_null_cursor_is_rejected(self):
+        response = self.client.get("/api/v1/top-rated?after_rating=null&after_id=2")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/v1/top-rated?after_id=2")
+        self.assertEqual(response.status_code, 400)
+
+
+class BackfillTokensTest(unittest.TestCase):
+    """backfill_tokens (flask init-db) em livros carregados antes das colunas de tokens."""
+
+    def setUp(self):
+        self.app = create_app()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add_all([
+            Book(title="The Black Maria", description="A book of poems", category="Poetry"),
+            Book(title="Sapiens", description=None, category="History", title_tokens=["sapiens"]),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_fills_only_null_tokens(self):
+        with mock.patch("routes.books._stopwords", return_value=frozenset({"the", "a", "of"})):
+            self.assertEqual(backfill_tokens(chunk_size=1), 1)
+        books = {b.title: b for b in db.session.scalars(db.select(Book))}
+        self.assertEqual(books["The Black Maria"].title_tokens, ["black", "maria"])
+        self.assertEqual(books["The Black Maria"].description_tokens, ["book", "poems"])
+        self.assertEqual(books["Sapiens"].title_tokens, ["sapiens"])
+
+    def test_missing_stopwords_raises(self):
+        with mock.patch("routes.books._stopwords", side_effect=LookupError):
+            with self.assertRaises(LookupError):
+                backfill_tokens()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import os
+import unittest
+
+import numpy as np
+from flask import Flask
+
+# Parâmetros fixos: o import de extensions não calibra o Argon2
+os.environ.setdefault("ARGON2_PARAMS", "1,8192")
+
+from extensions import ORJSONProvider
+
+
+class ORJSONProviderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.provider = ORJSONProvider(Flask(__name__))
+
+    def test_numpy_arrays(self):
+        self.assertEqual(self.provider.dumps({"b": np.array([1, 2]), "a": 1}), '{"a":1,"b":[1,2]}')
+
+    def test_indent_keeps_numpy_support(self):
+        # Modo debug (app.run(debug=True)) pede saída indentada
+        output = self.provider.dumps({"data": np.ascontiguousarray(np.array([1.5]))}, indent=2)
+        self.assertEqual(self.provider.loads(output), {"data": [1.5]})
+        self.assertIn("\n  ", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
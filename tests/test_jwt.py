@@ -0,0 +1,82 @@
+import os
+import unittest
+from datetime import timedelta
+
+# Parâmetros fixos: o import de extensions não calibra o Argon2
+os.environ.setdefault("ARGON2_PARAMS", "1,8192")
+
+from flask import Flask
+from flask_jwt_extended import create_access_token, create_refresh_token, decode_token, get_unverified_jwt_headers
+
+from extensions import jwt, create_access_token_fast, create_refresh_token_fast, _fast_jwt_enabled
+from flask_jwt_extended.default_callbacks import default_additional_claims_callback, default_jwt_headers_callback
+
+
+class FastJWTTest(unittest.TestCase):
+    """Os tokens de create_*_token_fast devem ter as mesmas claims dos do flask_jwt_extended."""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(
+            JWT_SECRET_KEY="test-secret",
+            JWT_VERIFY_SUB=False,
+            JWT_ACCESS_TOKEN_EXPIRES=timedelta(minutes=15),
+            JWT_REFRESH_TOKEN_EXPIRES=timedelta(days=7),
+        )
+        jwt.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+
+    def tearDown(self):
+        jwt._user_claims_callback = default_additional_claims_callback
+        jwt._jwt_additional_header_callback = default_jwt_headers_callback
+        self.ctx.pop()
+
+    def assertSameClaims(self, fast_token, reference_token):
+        fast, reference = decode_token(fast_token), decode_token(reference_token)
+        # jti/csrf são aleatórios e iat/nbf/exp podem cair em segundos diferentes
+        for claims in (fast, reference):
+            claims["jti"] = "<uuid>"
+            if "csrf" in claims:
+                claims["csrf"] = "<uuid>"
+        for key in ("iat", "nbf", "exp"):
+            self.assertAlmostEqual(fast.pop(key), reference.pop(key), delta=1)
+        self.assertEqual(fast, reference)
+
+    def test_fast_path_enabled_by_default(self):
+        self.assertTrue(_fast_jwt_enabled(self.app.config))
+
+    def test_access_token_matches_library(self):
+        self.assertSameClaims(create_access_token_fast(42), create_access_token(identity=42))
+
+    def test_refresh_token_matches_library(self):
+        self.assertSameClaims(create_refresh_token_fast(42), create_refresh_token(identity=42))
+
+    def test_secret_key_fallback(self):
+        # Sem JWT_SECRET_KEY o flask_jwt_extended assina com o SECRET_KEY do Flask
+        self.app.config.update(JWT_SECRET_KEY=None, SECRET_KEY="flask-secret")
+        self.assertSameClaims(create_access_token_fast(42), create_access_token(identity=42))
+
+    def test_int_expires(self):
+        self.app.config.update(JWT_ACCESS_TOKEN_EXPIRES=900, JWT_REFRESH_TOKEN_EXPIRES=3600)
+        self.assertSameClaims(create_access_token_fast(42), create_access_token(identity=42))
+        self.assertSameClaims(create_refresh_token_fast(42), create_refresh_token(identity=42))
+
+    def test_expires_disabled(self):
+        self.app.config.update(JWT_ACCESS_TOKEN_EXPIRES=False)
+        claims = decode_token(create_access_token_fast(42))
+        self.assertNotIn("exp", claims)
+
+    def test_additional_claims_loader_falls_back_to_library(self):
+        jwt.additional_claims_loader(lambda identity: {"role": "admin"})
+        self.assertFalse(_fast_jwt_enabled(self.app.config))
+        self.assertEqual(decode_token(create_access_token_fast(42))["role"], "admin")
+
+    def test_additional_headers_loader_falls_back_to_library(self):
+        jwt.additional_headers_loader(lambda identity: {"kid": "k1"})
+        self.assertFalse(_fast_jwt_enabled(self.app.config))
+        self.assertEqual(get_unverified_jwt_headers(create_access_token_fast(42))["kid"], "k1")
+
+
+if __name__ == "__main__":
+    unittest.main()